@@ -2,13 +2,17 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from typing import Dict, List, Set
+from typing import Deque, Dict, List, Optional, Set
+from collections import deque
+import asyncio
 import json
 import uuid
 from datetime import datetime
 from pathlib import Path
 import os
 
+from app import ot
+
 app = FastAPI(title="Collaborative Coding Interview Platform")
 
 # CORS configuration
@@ -38,10 +42,30 @@ sessions: Dict[str, dict] = {}
 # WebSocket connections: session_id -> set of WebSocket connections
 connections: Dict[str, Set[WebSocket]] = {}
 
+# Recent edits of each session's code, so operations made against an older version can be
+# transformed. None marks a full snapshot, which operations from before it cannot cross.
+# Clients whose version is no longer covered get a full snapshot to resync from.
+OPERATION_HISTORY_LIMIT = 1000
+operation_history: Dict[str, Deque[Optional[ot.Operation]]] = {}
+
+# Edits of a session are applied and sent out one at a time, so every client
+# receives them in version order
+session_locks: Dict[str, asyncio.Lock] = {}
+
+# Seconds a peer has to take a broadcast message before it is disconnected
+BROADCAST_SEND_TIMEOUT = float(os.getenv("BROADCAST_SEND_TIMEOUT", "5"))
+
+
+def encode_message(message: dict) -> str:
+    """Serialize a message to JSON text once, for every peer it is sent to."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, Set[WebSocket]] = {}
+        # Close tasks of dropped peers, kept so they are not garbage collected while running
+        self._closing: Set[asyncio.Task] = set()
 
     async def connect(self, websocket: WebSocket, session_id: str):
         await websocket.accept()
@@ -56,23 +80,108 @@ class ConnectionManager:
                 del self.active_connections[session_id]
 
     async def broadcast(self, message: dict, session_id: str, exclude: WebSocket = None):
-        if session_id in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[session_id]:
-                if connection != exclude:
-                    try:
-                        await connection.send_json(message)
-                    except:
-                        disconnected.add(connection)
-
-            # Clean up disconnected clients
-            for connection in disconnected:
+        """Send a message to every connection of a session but exclude.
+
+        The message is serialized once and sent to all peers concurrently. A peer
+        that fails or does not take the message within BROADCAST_SEND_TIMEOUT
+        seconds is disconnected, so one slow client cannot hold up the others;
+        it gets a fresh snapshot when it reconnects.
+        """
+        if session_id not in self.active_connections:
+            return
+
+        peers = [connection for connection in self.active_connections[session_id] if connection != exclude]
+        if not peers:
+            return
+
+        data = encode_message(message)
+        results = await asyncio.gather(*(self._send(connection, data) for connection in peers))
+
+        # Clean up disconnected and slow clients
+        for connection, delivered in zip(peers, results):
+            if not delivered:
                 self.disconnect(connection, session_id)
+                task = asyncio.create_task(self._close(connection))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+
+    async def _send(self, connection: WebSocket, data: str) -> bool:
+        try:
+            await asyncio.wait_for(connection.send_text(data), BROADCAST_SEND_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    async def _close(self, connection: WebSocket):
+        # The socket may be half written or already gone: closing is best effort
+        try:
+            await asyncio.wait_for(connection.close(code=1013, reason="Too slow"), BROADCAST_SEND_TIMEOUT)
+        except Exception:
+            pass
 
 
 manager = ConnectionManager()
 
 
+def _history(session_id: str) -> Deque[Optional[ot.Operation]]:
+    if session_id not in operation_history:
+        operation_history[session_id] = deque(maxlen=OPERATION_HISTORY_LIMIT)
+    return operation_history[session_id]
+
+
+def _session_lock(session_id: str) -> asyncio.Lock:
+    if session_id not in session_locks:
+        session_locks[session_id] = asyncio.Lock()
+    return session_locks[session_id]
+
+
+def apply_client_operation(session_id: str, base_version, operation) -> Optional[ot.Operation]:
+    """Transform a client operation against the edits it has not seen yet and apply it.
+
+    Returns the operation as applied, or None if the client has to resync
+    because its version is unknown or too old, or the operation is invalid.
+    """
+    session = sessions[session_id]
+    history = _history(session_id)
+    if not isinstance(base_version, int) or isinstance(base_version, bool):
+        return None
+
+    missed = session["version"] - base_version
+    if missed < 0 or missed > len(history):
+        return None
+
+    try:
+        operation = ot.normalize(operation)
+        for concurrent in list(history)[len(history) - missed:]:
+            if concurrent is None:
+                return None
+            operation, _ = ot.transform(operation, concurrent)
+        code = ot.apply(session["code"], operation)
+    except ValueError:
+        return None
+
+    session["code"] = code
+    session["version"] += 1
+    history.append(operation)
+    return operation
+
+
+def replace_code(session_id: str, code: str):
+    """Replace a session's code with a full snapshot (last-write-wins)."""
+    session = sessions[session_id]
+    session["code"] = code
+    session["version"] += 1
+    _history(session_id).append(None)
+
+
+def snapshot_message(session_id: str, message_type: str) -> dict:
+    return {
+        "type": message_type,
+        "code": sessions[session_id]["code"],
+        "version": sessions[session_id]["version"],
+    }
+
+
 @app.get("/api/health")
 async def health_check():
     return {"message": "Collaborative Coding Interview Platform API", "status": "healthy"}
@@ -86,6 +195,7 @@ async def create_session():
         "id": session_id,
         "code": "# Write your code here\n",
         "language": "python",
+        "version": 0,
         "created_at": datetime.now().isoformat(),
         "participants": 0
     }
@@ -115,12 +225,12 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     await manager.connect(websocket, session_id)
 
     try:
-        # Send current session state to the new client
-        await websocket.send_json({
-            "type": "init",
-            "code": sessions[session_id]["code"],
-            "language": sessions[session_id]["language"]
-        })
+        # Send current session state to the new client, before any edit made after it
+        async with _session_lock(session_id):
+            await websocket.send_json({
+                **snapshot_message(session_id, "init"),
+                "language": sessions[session_id]["language"]
+            })
 
         # Broadcast participant count update
         participant_count = len(manager.active_connections[session_id])
@@ -134,15 +244,34 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             data = await websocket.receive_json()
             message_type = data.get("type")
 
-            if message_type == "code_change":
-                # Update session code (last-write-wins)
-                sessions[session_id]["code"] = data.get("code", "")
-
-                # Broadcast to all other clients
-                await manager.broadcast({
-                    "type": "code_change",
-                    "code": data.get("code", "")
-                }, session_id, exclude=websocket)
+            if message_type == "operation":
+                # Apply an edit, transformed against the edits the client had not seen yet
+                async with _session_lock(session_id):
+                    operation = apply_client_operation(session_id, data.get("version"), data.get("operation"))
+                    if operation is None:
+                        await websocket.send_json(snapshot_message(session_id, "resync"))
+                        continue
+
+                    version = sessions[session_id]["version"]
+                    await websocket.send_json({"type": "ack", "version": version})
+                    await manager.broadcast({
+                        "type": "operation",
+                        "version": version,
+                        "operation": operation
+                    }, session_id, exclude=websocket)
+
+            elif message_type == "resync":
+                # Client lost track of the document: send a full snapshot
+                async with _session_lock(session_id):
+                    await websocket.send_json(snapshot_message(session_id, "resync"))
+
+            elif message_type == "code_change":
+                # Update session code with a full snapshot (last-write-wins)
+                async with _session_lock(session_id):
+                    replace_code(session_id, data.get("code", ""))
+
+                    # Broadcast to all other clients
+                    await manager.broadcast(snapshot_message(session_id, "code_change"), session_id, exclude=websocket)
 
             elif message_type == "language_change":
                 # Update programming language
@@ -0,0 +1,159 @@
+"""Operational transform for plain-text code edits.
+
+Operations use the compact format of ot.js: a list of components, where a
+positive integer retains that many characters, a negative integer deletes
+that many characters and a string inserts itself. An operation spans the
+whole document, so the sum of its retains and deletes is the length of the
+document it applies to. Lengths count Unicode code points.
+"""
+
+from typing import List, Tuple, Union
+
+Operation = List[Union[int, str]]
+
+
+class _OperationBuilder:
+    """Build an operation, merging adjacent components of the same kind."""
+
+    def __init__(self):
+        self.ops: Operation = []
+
+    def retain(self, n: int):
+        if n <= 0:
+            return
+        if self.ops and _is_retain(self.ops[-1]):
+            self.ops[-1] += n
+        else:
+            self.ops.append(n)
+
+    def insert(self, text: str):
+        if not text:
+            return
+        if self.ops and isinstance(self.ops[-1], str):
+            self.ops[-1] += text
+        elif self.ops and _is_delete(self.ops[-1]):
+            # Keep inserts before deletes, so equal edits have one representation
+            if len(self.ops) > 1 and isinstance(self.ops[-2], str):
+                self.ops[-2] += text
+            else:
+                self.ops.insert(len(self.ops) - 1, text)
+        else:
+            self.ops.append(text)
+
+    def delete(self, n: int):
+        if n <= 0:
+            return
+        if self.ops and _is_delete(self.ops[-1]):
+            self.ops[-1] -= n
+        else:
+            self.ops.append(-n)
+
+
+def _is_retain(component) -> bool:
+    return isinstance(component, int) and component > 0
+
+
+def _is_delete(component) -> bool:
+    return isinstance(component, int) and component < 0
+
+
+def normalize(ops) -> Operation:
+    """Validate an operation received from a client and merge its adjacent components.
+
+    Raises:
+        ValueError: If the operation is not a list of non-zero integers and strings
+    """
+    if not isinstance(ops, list):
+        raise ValueError("Operation must be a list")
+
+    builder = _OperationBuilder()
+    for component in ops:
+        if isinstance(component, str):
+            builder.insert(component)
+        elif isinstance(component, int) and not isinstance(component, bool) and component != 0:
+            if component > 0:
+                builder.retain(component)
+            else:
+                builder.delete(-component)
+        else:
+            raise ValueError(f"Invalid operation component: {component!r}")
+    return builder.ops
+
+
+def base_length(ops: Operation) -> int:
+    """Return the length of the document an operation applies to."""
+    return sum(abs(c) for c in ops if isinstance(c, int))
+
+
+def apply(text: str, ops: Operation) -> str:
+    """Apply an operation to a document and return the new document.
+
+    Raises:
+        ValueError: If the operation does not span the whole document
+    """
+    if base_length(ops) != len(text):
+        raise ValueError(f"Operation spans {base_length(ops)} characters, document has {len(text)}")
+
+    parts = []
+    position = 0
+    for component in ops:
+        if isinstance(component, str):
+            parts.append(component)
+        elif component > 0:
+            parts.append(text[position:position + component])
+            position += component
+        else:
+            position -= component
+    return "".join(parts)
+
+
+def transform(a: Operation, b: Operation) -> Tuple[Operation, Operation]:
+    """Transform two concurrent operations on the same document.
+
+    Returns (a', b') such that applying a then b' gives the same document as
+    applying b then a'. When both insert at the same position, the text
+    inserted by a comes first.
+
+    Raises:
+        ValueError: If the operations do not apply to documents of the same length
+    """
+    if base_length(a) != base_length(b):
+        raise ValueError("Concurrent operations must apply to the same document")
+
+    a_prime, b_prime = _OperationBuilder(), _OperationBuilder()
+    a_iter, b_iter = iter(a), iter(b)
+    op1, op2 = next(a_iter, None), next(b_iter, None)
+
+    while op1 is not None or op2 is not None:
+        if isinstance(op1, str):
+            a_prime.insert(op1)
+            b_prime.retain(len(op1))
+            op1 = next(a_iter, None)
+            continue
+        if isinstance(op2, str):
+            a_prime.retain(len(op2))
+            b_prime.insert(op2)
+            op2 = next(b_iter, None)
+            continue
+        if op1 is None or op2 is None:
+            raise ValueError("Concurrent operations must apply to the same document")
+
+        length = min(abs(op1), abs(op2))
+        if op1 > 0 and op2 > 0:
+            a_prime.retain(length)
+            b_prime.retain(length)
+        elif op1 < 0 and op2 > 0:
+            a_prime.delete(length)
+        elif op1 > 0 and op2 < 0:
+            b_prime.delete(length)
+        # Both deleted the same characters: nothing left to do for either
+
+        op1 = _consume(op1, length) or next(a_iter, None)
+        op2 = _consume(op2, length) or next(b_iter, None)
+
+    return a_prime.ops, b_prime.ops
+
+
+def _consume(component: int, length: int) -> int:
+    """Return what is left of a retain or delete after length characters, 0 if nothing."""
+    return component - length if component > 0 else component + length
@@ -0,0 +1,125 @@
+"""Benchmarks for the real-time collaboration protocol.
+
+Usage:
+    uv run python bench.py sync --lines 10000 --edits 2000 [--lag 3]
+"""
+
+import argparse
+import json
+import random
+import time
+from collections import deque
+
+from app import main as server
+from app import ot
+
+WORDS = (
+    "def return self value result items index count data name node left right "
+    "print append range len list dict key for in if else while import from"
+).split()
+
+
+def make_code(num_lines: int, seed: int = 42) -> str:
+    """Generate a Python-like source file of num_lines lines."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(num_lines):
+        indent = "    " * rng.randint(0, 3)
+        lines.append(f"{indent}{' '.join(rng.choices(WORDS, k=rng.randint(2, 8)))}  # line {i}")
+    return "\n".join(lines) + "\n"
+
+
+def random_edit(rng: random.Random, code: str) -> ot.Operation:
+    """Build a keystroke-sized operation: insert one character, or sometimes delete one."""
+    position = rng.randrange(len(code))
+    if rng.random() < 0.8:
+        return ot.normalize([position, rng.choice("abcdefgh ()\n"), len(code) - position])
+    return ot.normalize([position, -1, len(code) - position - 1])
+
+
+def encode(message: dict) -> bytes:
+    """Encode a message the way Starlette's send_json does."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _new_session(code: str) -> str:
+    session_id = "bench"
+    server.sessions[session_id] = {"id": session_id, "code": code, "language": "python", "version": 0}
+    server.operation_history.pop(session_id, None)
+    return session_id
+
+
+def bench_sync(args):
+    """Compare bytes and server CPU per edit of full code_change snapshots and operations."""
+    code = make_code(args.lines)
+    rng = random.Random(0)
+    print(f"Document: {args.lines} lines, {len(code.encode('utf-8')) / 1024:.0f} KB, {args.edits} edits, "
+          f"each made {args.lag} versions behind the server")
+
+    # Each edit is made against the document as its client last saw it, lag versions ago
+    session_id = _new_session(code)
+    seen = deque([code], maxlen=args.lag + 1)
+    edits = []
+    applied = []
+    for i in range(args.edits):
+        base_version = i + 1 - len(seen)
+        operation = random_edit(rng, seen[0])
+        edits.append((base_version, operation))
+        applied.append(server.apply_client_operation(session_id, base_version, operation))
+        seen.append(server.sessions[session_id]["code"])
+
+    # Snapshots: the client sends the whole buffer and the server relays it
+    session_id = _new_session(code)
+    current = code
+    snapshot = {"up": 0, "down": 0, "cpu": 0.0}
+    for operation in applied:
+        current = ot.apply(current, operation)
+        message = encode({"type": "code_change", "code": current})
+
+        start = time.process_time()
+        data = json.loads(message)
+        server.replace_code(session_id, data["code"])
+        relayed = encode(server.snapshot_message(session_id, "code_change"))
+        snapshot["cpu"] += time.process_time() - start
+        snapshot["up"] += len(message)
+        snapshot["down"] += len(relayed)
+
+    # Operations: the client sends the edit, the server transforms, applies, acks and relays it
+    session_id = _new_session(code)
+    delta = {"up": 0, "down": 0, "cpu": 0.0}
+    for base_version, operation in edits:
+        message = encode({"type": "operation", "version": base_version, "operation": operation})
+
+        start = time.process_time()
+        data = json.loads(message)
+        operation = server.apply_client_operation(session_id, data["version"], data["operation"])
+        version = server.sessions[session_id]["version"]
+        encode({"type": "ack", "version": version})
+        relayed = encode({"type": "operation", "version": version, "operation": operation})
+        delta["cpu"] += time.process_time() - start
+        delta["up"] += len(message)
+        delta["down"] += len(relayed)
+
+    assert server.sessions[session_id]["code"] == current, "both protocols must end with the same document"
+    for name, totals in (("snapshots", snapshot), ("operations", delta)):
+        print(f"{name:>10}: {totals['up'] / args.edits:10.1f} B up, {totals['down'] / args.edits:10.1f} B down "
+              f"per peer, {totals['cpu'] / args.edits * 1e6:8.1f} us server CPU per edit")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sync_parser = subparsers.add_parser("sync", help="bytes and CPU per edit of snapshots vs operations")
+    sync_parser.add_argument("--lines", type=int, default=10000, help="number of lines in the shared document")
+    sync_parser.add_argument("--edits", type=int, default=2000, help="number of edits to replay")
+    sync_parser.add_argument("--lag", type=int, default=0,
+                             help="versions each edit is behind, i.e. concurrent edits it is transformed against")
+    sync_parser.set_defaults(func=bench_sync)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,9 @@ import asyncio
 
 @pytest.fixture
 def client():
-    """Create a test client for the FastAPI app"""
-    return TestClient(app)
+    """Create a test client for the FastAPI app, running every connection on one event loop"""
+    with TestClient(app) as client:
+        yield client
 
 
 @pytest.fixture(autouse=True)
@@ -330,6 +331,118 @@ class TestMultiClientCollaboration:
                 assert sessions[session_id]["code"] == "// Code change 4"
 
 
+class TestOperationSync:
+    """Test delta-based code synchronization with operations"""
+
+    def test_init_includes_version(self, client):
+        """Test the init message carries the document version"""
+        response = client.post("/sessions")
+        session_id = response.json()["session_id"]
+
+        with client.websocket_connect(f"/ws/{session_id}") as ws1:
+            data = ws1.receive_json()
+            assert data["type"] == "init"
+            assert data["version"] == 0
+
+    def test_operation_is_acked_and_broadcast(self, client):
+        """Test an operation is applied, acknowledged and relayed to other clients"""
+        response = client.post("/sessions")
+        session_id = response.json()["session_id"]
+        code = sessions[session_id]["code"]
+
+        with client.websocket_connect(f"/ws/{session_id}") as ws1:
+            ws1.receive_json()  # init
+            ws1.receive_json()  # participants
+
+            with client.websocket_connect(f"/ws/{session_id}") as ws2:
+                ws2.receive_json()  # init
+                ws2.receive_json()  # participants
+                ws1.receive_json()  # participants update
+
+                operation = [len(code), "print('hi')\n"]
+                ws1.send_json({"type": "operation", "version": 0, "operation": operation})
+
+                assert ws1.receive_json() == {"type": "ack", "version": 1}
+                assert ws2.receive_json() == {"type": "operation", "version": 1, "operation": operation}
+
+        assert sessions[session_id]["code"] == code + "print('hi')\n"
+        assert sessions[session_id]["version"] == 1
+
+    def test_concurrent_operations_are_transformed(self, client):
+        """Test an operation based on an older version is transformed before it is applied"""
+        response = client.post("/sessions")
+        session_id = response.json()["session_id"]
+        code = sessions[session_id]["code"]
+
+        with client.websocket_connect(f"/ws/{session_id}") as ws1:
+            ws1.receive_json()  # init
+            ws1.receive_json()  # participants
+
+            with client.websocket_connect(f"/ws/{session_id}") as ws2:
+                ws2.receive_json()  # init
+                ws2.receive_json()  # participants
+                ws1.receive_json()  # participants update
+
+                # Both clients edit version 0
+                ws1.send_json({"type": "operation", "version": 0, "operation": ["A", len(code)]})
+                assert ws1.receive_json()["type"] == "ack"
+                ws2.send_json({"type": "operation", "version": 0, "operation": [len(code), "B"]})
+
+                # Client 2 first receives client 1's edit, then the ack of its own
+                data = ws2.receive_json()
+                assert data == {"type": "operation", "version": 1, "operation": ["A", len(code)]}
+                assert ws2.receive_json() == {"type": "ack", "version": 2}
+
+                # Client 1 receives client 2's edit shifted past the inserted text
+                data = ws1.receive_json()
+                assert data == {"type": "operation", "version": 2, "operation": [len(code) + 1, "B"]}
+
+        assert sessions[session_id]["code"] == "A" + code + "B"
+
+    def test_invalid_operation_triggers_resync(self, client):
+        """Test an operation that does not fit the document is answered with a snapshot"""
+        response = client.post("/sessions")
+        session_id = response.json()["session_id"]
+
+        with client.websocket_connect(f"/ws/{session_id}") as ws1:
+            ws1.receive_json()  # init
+            ws1.receive_json()  # participants
+
+            ws1.send_json({"type": "operation", "version": 0, "operation": [1, "x"]})
+            data = ws1.receive_json()
+            assert data["type"] == "resync"
+            assert data["code"] == "# Write your code here\n"
+            assert data["version"] == 0
+
+    def test_operation_before_snapshot_triggers_resync(self, client):
+        """Test an operation cannot be transformed across a full code_change snapshot"""
+        response = client.post("/sessions")
+        session_id = response.json()["session_id"]
+
+        with client.websocket_connect(f"/ws/{session_id}") as ws1:
+            ws1.receive_json()  # init
+            ws1.receive_json()  # participants
+
+            ws1.send_json({"type": "code_change", "code": "x = 1"})
+            ws1.send_json({"type": "operation", "version": 0, "operation": ["y", 23]})
+
+            data = ws1.receive_json()
+            assert data == {"type": "resync", "code": "x = 1", "version": 1}
+
+    def test_resync_request(self, client):
+        """Test a client can ask for a full snapshot"""
+        response = client.post("/sessions")
+        session_id = response.json()["session_id"]
+
+        with client.websocket_connect(f"/ws/{session_id}") as ws1:
+            ws1.receive_json()  # init
+            ws1.receive_json()  # participants
+
+            ws1.send_json({"type": "resync"})
+            data = ws1.receive_json()
+            assert data == {"type": "resync", "code": "# Write your code here\n", "version": 0}
+
+
 class TestEdgeCases:
     """Test edge cases and error handling"""
 
@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from app.ot import apply, base_length, normalize, transform
+
+
+def random_operation(rng: random.Random, text: str) -> list:
+    """Build a random operation spanning text"""
+    operation = []
+    position = 0
+    while position < len(text):
+        length = rng.randint(1, len(text) - position)
+        kind = rng.random()
+        if kind < 0.3:
+            operation.append(rng.choice(["x", "yy", "\n", "é😀"]))
+        operation.append(length if kind < 0.6 else -length)
+        position += length
+    if rng.random() < 0.5:
+        operation.append("z")
+    return normalize(operation)
+
+
+class TestApply:
+    """Test applying operations to documents"""
+
+    def test_insert_retain_delete(self):
+        """Test an operation mixing every kind of component"""
+        assert apply("hello world", [6, "brave ", -5, "there"]) == "hello brave there"
+
+    def test_operation_must_span_document(self):
+        """Test an operation for a document of another length is rejected"""
+        with pytest.raises(ValueError):
+            apply("hello", [3, "x"])
+
+    def test_code_points(self):
+        """Test lengths count code points, not UTF-16 units"""
+        assert apply("a😀b", [2, "c", 1]) == "a😀cb"
+
+
+class TestNormalize:
+    """Test validation of operations received from clients"""
+
+    def test_merges_adjacent_components(self):
+        """Test adjacent components of the same kind are merged"""
+        assert normalize([1, 2, "a", "b", -1, -2]) == [3, "ab", -3]
+
+    def test_inserts_move_before_deletes(self):
+        """Test an insert after a delete is moved in front of it"""
+        assert normalize([2, -1, "a"]) == [2, "a", -1]
+
+    @pytest.mark.parametrize("operation", ["abc", [0], [1.5], [True], [None], [{"insert": "a"}]])
+    def test_rejects_invalid_operations(self, operation):
+        """Test malformed operations raise ValueError"""
+        with pytest.raises(ValueError):
+            normalize(operation)
+
+
+class TestTransform:
+    """Test transforming concurrent operations"""
+
+    def test_concurrent_inserts_at_same_position(self):
+        """Test the first operation's insert goes first on both sides"""
+        a, b = [2, "A", 1], [2, "B", 1]
+        a_prime, b_prime = transform(a, b)
+        assert apply(apply("xyz", a), b_prime) == apply(apply("xyz", b), a_prime) == "xyABz"
+
+    def test_overlapping_deletes(self):
+        """Test characters deleted by both operations are deleted once"""
+        a, b = [1, -3, 1], [2, -3]
+        a_prime, b_prime = transform(a, b)
+        assert apply(apply("abcde", a), b_prime) == apply(apply("abcde", b), a_prime) == "a"
+
+    def test_different_documents(self):
+        """Test operations on documents of different lengths are rejected"""
+        with pytest.raises(ValueError):
+            transform([3], [4])
+
+    def test_random_operations_converge(self):
+        """Test applying either operation first gives the same document"""
+        rng = random.Random(0)
+        for _ in range(2000):
+            text = "".join(rng.choice("ab\n😀") for _ in range(rng.randint(0, 20)))
+            a, b = random_operation(rng, text), random_operation(rng, text)
+            a_prime, b_prime = transform(a, b)
+            assert base_length(a_prime) == len(apply(text, b))
+            assert apply(apply(text, a), b_prime) == apply(apply(text, b), a_prime)
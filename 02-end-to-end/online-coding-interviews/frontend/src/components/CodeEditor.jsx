@@ -1,5 +1,6 @@
-import { useRef, useEffect } from 'react'
+import { useRef, useEffect, forwardRef, useImperativeHandle } from 'react'
 import Editor from '@monaco-editor/react'
+import { editsFromOperation } from '../ot'
 import './CodeEditor.css'
 
 const LANGUAGE_MAP = {
@@ -15,38 +16,66 @@ const LANGUAGE_MAP = {
   php: 'php',
 }
 
-function CodeEditor({
+const CodeEditor = forwardRef(function CodeEditor({
   code,
   language,
   onChange,
   onLanguageChange,
   readOnly = false
-}) {
+}, ref) {
   const editorRef = useRef(null)
-  const isLocalChangeRef = useRef(false)
+  const isRemoteChangeRef = useRef(false)
 
   const handleEditorDidMount = (editor) => {
     editorRef.current = editor
   }
 
-  const handleEditorChange = (value) => {
-    if (!isLocalChangeRef.current && onChange) {
-      isLocalChangeRef.current = true
-      onChange(value || '')
-      // Reset flag after a short delay
-      setTimeout(() => {
-        isLocalChangeRef.current = false
-      }, 100)
+  // Local edits are reported with their changes; edits applied from the WebSocket are not
+  const handleEditorChange = (value, event) => {
+    if (!isRemoteChangeRef.current && onChange) {
+      onChange(value || '', event.changes)
     }
   }
 
-  // Update editor when code changes from WebSocket (but not from local edits)
+  const applyRemote = (apply) => {
+    isRemoteChangeRef.current = true
+    try {
+      apply()
+    } finally {
+      isRemoteChangeRef.current = false
+    }
+  }
+
+  // Apply a remote operation in place, so the cursor and selection follow the edit
+  useImperativeHandle(ref, () => ({
+    applyOperation(operation) {
+      const model = editorRef.current?.getModel()
+      if (!model) return
+
+      const edits = editsFromOperation(model.getValue(), operation).map(({ start, end, text }) => {
+        const from = model.getPositionAt(start)
+        const to = model.getPositionAt(end)
+        return {
+          range: {
+            startLineNumber: from.lineNumber,
+            startColumn: from.column,
+            endLineNumber: to.lineNumber,
+            endColumn: to.column
+          },
+          text
+        }
+      })
+      applyRemote(() => model.applyEdits(edits))
+    }
+  }), [])
+
+  // Replace the editor content when a full snapshot arrives
   useEffect(() => {
-    if (editorRef.current && !isLocalChangeRef.current) {
+    if (editorRef.current) {
       const currentValue = editorRef.current.getValue()
       if (currentValue !== code) {
         const position = editorRef.current.getPosition()
-        editorRef.current.setValue(code)
+        applyRemote(() => editorRef.current.setValue(code))
         // Restore cursor position if possible
         if (position) {
           editorRef.current.setPosition(position)
@@ -92,6 +121,6 @@ function CodeEditor({
       />
     </div>
   )
-}
+})
 
 export default CodeEditor
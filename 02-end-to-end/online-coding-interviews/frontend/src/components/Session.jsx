@@ -1,8 +1,9 @@
-import { useState, useEffect, useCallback } from 'react'
+import { useState, useEffect, useCallback, useRef } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import CodeEditor from './CodeEditor'
 import CodeExecutor from './CodeExecutor'
 import { useWebSocket } from '../hooks/useWebSocket'
+import { useCodeSync } from '../hooks/useCodeSync'
 import { API_URL } from '../config'
 import './Session.css'
 
@@ -16,7 +17,10 @@ function Session() {
   const [sessionNotFound, setSessionNotFound] = useState(false)
   const [shareDialogOpen, setShareDialogOpen] = useState(false)
 
+  const editorRef = useRef(null)
+
   const { isConnected, participants, send, on, off } = useWebSocket(sessionId)
+  const handleCodeChange = useCodeSync({ send, on, off, editorRef, setCode })
 
   // Fetch session data on mount
   useEffect(() => {
@@ -39,40 +43,25 @@ function Session() {
     fetchSession()
   }, [sessionId])
 
-  // Handle incoming WebSocket messages
+  // Handle incoming WebSocket messages (code updates are handled by useCodeSync)
   useEffect(() => {
     const handleInit = (data) => {
-      setCode(data.code)
       setLanguage(data.language)
     }
 
-    const handleCodeChange = (data) => {
-      setCode(data.code)
-    }
-
     const handleLanguageChange = (data) => {
       setLanguage(data.language)
     }
 
     on('init', handleInit)
-    on('code_change', handleCodeChange)
     on('language_change', handleLanguageChange)
 
     return () => {
       off('init', handleInit)
-      off('code_change', handleCodeChange)
       off('language_change', handleLanguageChange)
     }
   }, [on, off])
 
-  const handleCodeChange = useCallback((newCode) => {
-    setCode(newCode)
-    send({
-      type: 'code_change',
-      code: newCode
-    })
-  }, [send])
-
   const handleLanguageChange = useCallback((newLanguage) => {
     setLanguage(newLanguage)
     send({
@@ -137,6 +126,7 @@ function Session() {
       <div className="session-content">
         <div className="editor-panel">
           <CodeEditor
+            ref={editorRef}
             code={code}
             language={language}
             onChange={handleCodeChange}
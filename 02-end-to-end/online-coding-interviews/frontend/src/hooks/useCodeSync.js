@@ -0,0 +1,75 @@
+import { useCallback, useEffect, useRef } from 'react'
+import { applyOperation, compose, operationFromChanges, transform } from '../ot'
+
+// Keep the shared code in sync by exchanging operations instead of the whole buffer.
+// At most one operation is in flight; local edits made while it waits for its ack
+// are composed into a buffer, and remote operations are transformed against both.
+export function useCodeSync({ send, on, off, editorRef, setCode }) {
+  const documentRef = useRef('')
+  const versionRef = useRef(0)
+  const pendingRef = useRef(null)
+  const bufferRef = useRef(null)
+
+  useEffect(() => {
+    // init, resync and full code_change snapshots replace the document
+    const handleSnapshot = (data) => {
+      documentRef.current = data.code
+      versionRef.current = data.version
+      pendingRef.current = null
+      bufferRef.current = null
+      setCode(data.code)
+    }
+
+    const handleOperation = (data) => {
+      let operation = data.operation
+      if (pendingRef.current) {
+        [pendingRef.current, operation] = transform(pendingRef.current, operation)
+      }
+      if (bufferRef.current) {
+        [bufferRef.current, operation] = transform(bufferRef.current, operation)
+      }
+      versionRef.current = data.version
+
+      editorRef.current?.applyOperation(operation)
+      documentRef.current = applyOperation(documentRef.current, operation)
+      setCode(documentRef.current)
+    }
+
+    const handleAck = (data) => {
+      versionRef.current = data.version
+      pendingRef.current = bufferRef.current
+      bufferRef.current = null
+      if (pendingRef.current) {
+        send({ type: 'operation', version: versionRef.current, operation: pendingRef.current })
+      }
+    }
+
+    on('init', handleSnapshot)
+    on('resync', handleSnapshot)
+    on('code_change', handleSnapshot)
+    on('operation', handleOperation)
+    on('ack', handleAck)
+
+    return () => {
+      off('init', handleSnapshot)
+      off('resync', handleSnapshot)
+      off('code_change', handleSnapshot)
+      off('operation', handleOperation)
+      off('ack', handleAck)
+    }
+  }, [send, on, off, editorRef, setCode])
+
+  // Called with the new value and the Monaco changes of every local edit
+  return useCallback((value, changes) => {
+    const operation = operationFromChanges(documentRef.current, changes)
+    documentRef.current = value
+    setCode(value)
+
+    if (pendingRef.current) {
+      bufferRef.current = bufferRef.current ? compose(bufferRef.current, operation) : operation
+    } else {
+      pendingRef.current = operation
+      send({ type: 'operation', version: versionRef.current, operation })
+    }
+  }, [send, setCode])
+}
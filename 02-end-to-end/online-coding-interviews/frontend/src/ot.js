@@ -0,0 +1,192 @@
+// Operational transform for plain-text code edits, matching backend/app/ot.py.
+//
+// An operation is a list of components: a positive number retains that many
+// characters, a negative number deletes that many and a string inserts
+// itself. Lengths count Unicode code points, like Python strings, while
+// JavaScript strings and Monaco offsets count UTF-16 units.
+
+const SURROGATE = /[\uD800-\uDFFF]/
+
+const isRetain = (op) => typeof op === 'number' && op > 0
+const isDelete = (op) => typeof op === 'number' && op < 0
+const isInsert = (op) => typeof op === 'string'
+
+export function codePointLength(text) {
+  return SURROGATE.test(text) ? Array.from(text).length : text.length
+}
+
+function sliceCodePoints(text, start, end) {
+  return SURROGATE.test(text) ? Array.from(text).slice(start, end).join('') : text.slice(start, end)
+}
+
+// UTF-16 index reached by advancing count code points from index
+function advance(text, index, count) {
+  if (!SURROGATE.test(text)) return index + count
+  for (let i = 0; i < count; i++) {
+    index += text.codePointAt(index) > 0xffff ? 2 : 1
+  }
+  return index
+}
+
+class OperationBuilder {
+  constructor() {
+    this.ops = []
+  }
+
+  retain(n) {
+    if (n <= 0) return
+    const last = this.ops.length - 1
+    if (isRetain(this.ops[last])) this.ops[last] += n
+    else this.ops.push(n)
+  }
+
+  insert(text) {
+    if (!text) return
+    const last = this.ops.length - 1
+    if (isInsert(this.ops[last])) {
+      this.ops[last] += text
+    } else if (isDelete(this.ops[last])) {
+      // Keep inserts before deletes, like the server does
+      if (isInsert(this.ops[last - 1])) this.ops[last - 1] += text
+      else this.ops.splice(last, 0, text)
+    } else {
+      this.ops.push(text)
+    }
+  }
+
+  delete(n) {
+    if (n <= 0) return
+    const last = this.ops.length - 1
+    if (isDelete(this.ops[last])) this.ops[last] -= n
+    else this.ops.push(-n)
+  }
+}
+
+// Transform concurrent operations a and b into [a', b'], so that a then b'
+// equals b then a'. On equal positions, the text inserted by a goes first.
+export function transform(a, b) {
+  const aPrime = new OperationBuilder()
+  const bPrime = new OperationBuilder()
+  let i = 0
+  let j = 0
+  let op1 = a[i++]
+  let op2 = b[j++]
+
+  while (op1 !== undefined || op2 !== undefined) {
+    if (isInsert(op1)) {
+      aPrime.insert(op1)
+      bPrime.retain(codePointLength(op1))
+      op1 = a[i++]
+      continue
+    }
+    if (isInsert(op2)) {
+      aPrime.retain(codePointLength(op2))
+      bPrime.insert(op2)
+      op2 = b[j++]
+      continue
+    }
+    if (op1 === undefined || op2 === undefined) {
+      throw new Error('Concurrent operations must apply to the same document')
+    }
+
+    const length = Math.min(Math.abs(op1), Math.abs(op2))
+    if (op1 > 0 && op2 > 0) {
+      aPrime.retain(length)
+      bPrime.retain(length)
+    } else if (op1 < 0 && op2 > 0) {
+      aPrime.delete(length)
+    } else if (op1 > 0 && op2 < 0) {
+      bPrime.delete(length)
+    }
+
+    op1 = (op1 > 0 ? op1 - length : op1 + length) || a[i++]
+    op2 = (op2 > 0 ? op2 - length : op2 + length) || b[j++]
+  }
+
+  return [aPrime.ops, bPrime.ops]
+}
+
+// Combine a and then b into a single operation
+export function compose(a, b) {
+  const result = new OperationBuilder()
+  let i = 0
+  let j = 0
+  let op1 = a[i++]
+  let op2 = b[j++]
+
+  while (op1 !== undefined || op2 !== undefined) {
+    if (isDelete(op1)) {
+      result.delete(-op1)
+      op1 = a[i++]
+      continue
+    }
+    if (isInsert(op2)) {
+      result.insert(op2)
+      op2 = b[j++]
+      continue
+    }
+    if (op1 === undefined || op2 === undefined) {
+      throw new Error('The second operation must apply to the result of the first')
+    }
+
+    const length = Math.min(isInsert(op1) ? codePointLength(op1) : op1, Math.abs(op2))
+    if (isInsert(op1)) {
+      if (op2 > 0) result.insert(sliceCodePoints(op1, 0, length))
+      op1 = sliceCodePoints(op1, length) || a[i++]
+    } else {
+      if (op2 > 0) result.retain(length)
+      else result.delete(length)
+      op1 = op1 - length || a[i++]
+    }
+    op2 = (op2 > 0 ? op2 - length : op2 + length) || b[j++]
+  }
+
+  return result.ops
+}
+
+// Build the operation for the changes of a Monaco content change event,
+// given the document before the changes
+export function operationFromChanges(text, changes) {
+  const builder = new OperationBuilder()
+  let index = 0
+  const sorted = [...changes].sort((x, y) => x.rangeOffset - y.rangeOffset)
+
+  for (const change of sorted) {
+    builder.retain(codePointLength(text.slice(index, change.rangeOffset)))
+    builder.insert(change.text)
+    builder.delete(codePointLength(text.slice(change.rangeOffset, change.rangeOffset + change.rangeLength)))
+    index = change.rangeOffset + change.rangeLength
+  }
+  builder.retain(codePointLength(text.slice(index)))
+  return builder.ops
+}
+
+// Turn an operation into Monaco edits, as UTF-16 offset ranges of the document before it
+export function editsFromOperation(text, operation) {
+  const edits = []
+  let index = 0
+
+  for (const op of operation) {
+    if (isRetain(op)) {
+      index = advance(text, index, op)
+    } else if (isInsert(op)) {
+      edits.push({ start: index, end: index, text: op })
+    } else {
+      const end = advance(text, index, -op)
+      const last = edits[edits.length - 1]
+      if (last && last.end === index) last.end = end
+      else edits.push({ start: index, end, text: '' })
+      index = end
+    }
+  }
+  return edits
+}
+
+// Apply an operation to a document
+export function applyOperation(text, operation) {
+  let result = text
+  for (const edit of editsFromOperation(text, operation).reverse()) {
+    result = result.slice(0, edit.start) + edit.text + result.slice(edit.end)
+  }
+  return result
+}
@@ -0,0 +1,680 @@
+"""Benchmarks for the documentation search pipeline.
+
+Usage:
+    uv run python bench.py cache --docs 2000
+    uv run python bench.py payload --docs 500
+    uv run python bench.py parallel --docs 20000
+    uv run python bench.py streaming --docs 20000
+    uv run python bench.py backends --chunks 100000
+    uv run python bench.py store --docs 20000
+    uv run python bench.py fuzzy --terms 100000
+    uv run python bench.py tokenize --docs 2000
+    uv run python bench.py dense --vectors 100000 [--model BAAI/bge-small-en-v1.5]
+    uv run python bench.py suite --docs 1000 10000 --output results.json [--profile cprofile]
+    uv run python bench.py compare baseline.json results.json
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import platform
+import pstats
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+import main as server
+from dense import EXACT_SEARCH_MAX, Embedder, IVFIndex
+from doc_store import DocumentStore
+from fuzzy import TermExpander
+from search import (
+    BACKENDS, TOKEN_RE, load_docs_from_zip, iter_docs_from_zip, chunk_docs, create_index, create_index_streaming,
+    search, tokenize, code_symbols,
+)
+
+WORDS = (
+    "server client tool resource prompt context transport stdio http websocket "
+    "authentication token session request response schema model message stream "
+    "handler middleware decorator function argument parameter return value error "
+    "exception logging configuration deployment docker python async await task "
+    "queue cache index search query document archive markdown section example"
+).split()
+
+
+def make_synthetic_zip(zip_path: str, num_docs: int, sections_per_doc: int = 6,
+                       words_per_section: int = 120, seed: int = 42) -> str:
+    """
+    Generate a zip archive of synthetic markdown documentation.
+
+    Args:
+        zip_path: Where to write the zip file
+        num_docs: Number of markdown files to generate
+        sections_per_doc: Number of headed sections per file
+        words_per_section: Number of words in each section body
+        seed: Random seed, so the same arguments always produce the same archive
+
+    Returns:
+        The path of the written zip file
+    """
+    rng = random.Random(seed)
+
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for i in range(num_docs):
+            lines = [f"# Document {i} {rng.choice(WORDS)}", ""]
+            for j in range(sections_per_doc):
+                lines.append(f"## Section {j} {rng.choice(WORDS)} {rng.choice(WORDS)}")
+                lines.append("")
+                lines.append(" ".join(rng.choice(WORDS) for _ in range(words_per_section)))
+                lines.append("")
+            zf.writestr(f"docs-main/docs/page_{i:06d}.md", "\n".join(lines))
+
+    return zip_path
+
+
+def make_api_doc(rng: random.Random, sections: int = 6) -> str:
+    """Generate an MDX page in the style of API documentation, with components, inline code and code blocks."""
+    lines = ['import { Card, Tip } from "@/components"', "", f"# {rng.choice(WORDS).title()} API", ""]
+    for _ in range(sections):
+        cls = "".join(word.title() for word in rng.sample(WORDS, 2))
+        method = "_".join(rng.sample(WORDS, 2))
+        lines += [
+            f"## {cls}.{method}", "",
+            f'<Card title="{rng.choice(WORDS)} {rng.choice(WORDS)}" icon="code" href="/{rng.choice(WORDS)}">',
+            f"Call `{cls}.{method}()` to {' '.join(rng.choice(WORDS) for _ in range(40))}.",
+            "</Card>", "",
+            "```python",
+            f"from fastmcp import {cls}",
+            f"{method.split('_')[0]} = {cls}(name=\"{rng.choice(WORDS)}\")",
+            f"result = await {method.split('_')[0]}.{method}({rng.choice(WORDS)}_{rng.choice(WORDS)}=True)",
+            "```", "",
+            " ".join(rng.choice(WORDS) for _ in range(80)), "",
+        ]
+    return "\n".join(lines)
+
+
+def _timed(func, *args, **kwargs):
+    """Call a function and return (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _percentiles(latencies: list[float]) -> dict:
+    """Return the p50, p95 and p99 of a list of latencies."""
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+def bench_cache(args):
+    """Compare cold and warm first-query latency of the index cache."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Never touch the real index cache
+        os.environ["INDEX_CACHE_DIR"] = os.path.join(tmp_dir, "cache")
+
+        zip_path = make_synthetic_zip(os.path.join(tmp_dir, "docs.zip"), args.docs)
+        print(f"Synthetic archive: {args.docs} documents, {os.path.getsize(zip_path) / 1e6:.1f} MB")
+
+        def first_query():
+            server.loaded_indexes.clear()
+            info = server._load_zip_index(zip_path)
+            return search(info["index"], args.query)
+
+        cold = []
+        warm = []
+        for _ in range(args.repeat):
+            server.invalidate_cache()
+            _, elapsed = _timed(first_query)
+            cold.append(elapsed)
+
+            _, elapsed = _timed(first_query)
+            warm.append(elapsed)
+
+        print(f"Cold first query: {min(cold) * 1000:8.1f} ms (best of {args.repeat})")
+        print(f"Warm first query: {min(warm) * 1000:8.1f} ms (best of {args.repeat})")
+        print(f"Speedup:          {min(cold) / min(warm):8.1f}x")
+
+
+def bench_payload(args):
+    """Compare search_docs response size for whole-file, chunk-level and snippet results."""
+    queries = [" ".join(random.Random(i).sample(WORDS, 2)) for i in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        zip_path = make_synthetic_zip(os.path.join(tmp_dir, "docs.zip"), args.docs,
+                                      sections_per_doc=args.sections)
+        docs = load_docs_from_zip(zip_path)
+        chunks = chunk_docs(docs)
+        print(f"Synthetic archive: {len(docs)} documents, {len(chunks)} chunks")
+
+        file_index = create_index(docs)
+        chunk_index = create_index(chunks)
+        variants = [
+            ("whole files", file_index, 0),
+            ("file snippets", file_index, server.DEFAULT_SNIPPET_CHARS),
+            ("chunks", chunk_index, 0),
+            ("snippets", chunk_index, server.DEFAULT_SNIPPET_CHARS),
+        ]
+        for name, index, max_chars in variants:
+            sizes = []
+            latencies = []
+            for query in queries:
+                response, elapsed = _timed(
+                    lambda: server._format_results(server._with_snippets(search(index, query), query, max_chars))
+                )
+                sizes.append(len(response.encode('utf-8')))
+                latencies.append(elapsed * 1000)
+            print(f"{name:>13}: {sum(sizes) / len(sizes) / 1024:8.1f} KB per response, "
+                  f"search + format p50 {statistics.median(latencies):7.3f} ms")
+
+
+def bench_parallel(args):
+    """Measure how parallel zip member decoding scales with the number of workers."""
+    max_workers = args.max_workers or os.cpu_count() or 1
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != max_workers:
+        worker_counts.append(max_workers)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        zip_path = make_synthetic_zip(os.path.join(tmp_dir, "docs.zip"), args.docs)
+        print(f"Synthetic archive: {args.docs} documents, {os.path.getsize(zip_path) / 1e6:.1f} MB, "
+              f"{os.cpu_count()} CPUs")
+
+        expected = load_docs_from_zip(zip_path)
+        for executor in ["thread", "process"]:
+            baseline = None
+            for workers in worker_counts:
+                timings = []
+                for _ in range(args.repeat):
+                    docs, elapsed = _timed(load_docs_from_zip, zip_path, workers=workers, executor=executor)
+                    timings.append(elapsed)
+                assert docs == expected, "parallel load must return documents in archive order"
+
+                best = min(timings)
+                baseline = baseline or best
+                print(f"{executor:>8} x{workers:<3} {best * 1000:8.1f} ms  speedup {baseline / best:5.2f}x")
+
+
+def _peak_rss_mb() -> float:
+    """Return the peak resident set size of this process, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def bench_rss(args):
+    """Build one index in this process and report its peak RSS (used by bench_streaming)."""
+    baseline = _peak_rss_mb()
+
+    if args.mode == "list":
+        index, elapsed = _timed(lambda: create_index(chunk_docs(load_docs_from_zip(args.zip_path))))
+    else:
+        index, elapsed = _timed(create_index_streaming, iter_docs_from_zip(args.zip_path), batch_size=args.batch_size)
+
+    peak = _peak_rss_mb()
+    print(f"{args.mode:>10}: {len(index.docs)} chunks, build {elapsed:6.1f} s, "
+          f"peak RSS {peak:7.1f} MB ({peak - baseline:+7.1f} MB over baseline)")
+
+
+def bench_streaming(args):
+    """Compare peak RSS of list-based and streaming index builds, each in a fresh process."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        zip_path = make_synthetic_zip(os.path.join(tmp_dir, "docs.zip"), args.docs)
+        print(f"Synthetic archive: {args.docs} documents, {os.path.getsize(zip_path) / 1e6:.1f} MB")
+
+        for mode in ["list", "streaming"]:
+            command = [sys.executable, os.path.abspath(__file__), "rss", zip_path,
+                       "--mode", mode, "--batch-size", str(args.batch_size)]
+            print(subprocess.run(command, capture_output=True, text=True, check=True).stdout.strip())
+
+
+def bench_backends(args):
+    """Compare fit time and query latency of the search backends."""
+    # The synthetic generator produces one chunk per section plus one for the title
+    num_docs = max(1, args.chunks // 7)
+    queries = [" ".join(random.Random(i).sample(WORDS, 2)) for i in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        zip_path = make_synthetic_zip(os.path.join(tmp_dir, "docs.zip"), num_docs)
+        chunks = chunk_docs(load_docs_from_zip(zip_path))
+    print(f"Corpus: {len(chunks)} chunks, {args.queries} queries")
+
+    for backend in args.backends or list(BACKENDS):
+        index, fit_time = _timed(create_index, chunks, backend=backend)
+        # Warm up lazily computed state before timing queries
+        search(index, queries[0])
+
+        latencies = []
+        for query in queries:
+            _, elapsed = _timed(search, index, query)
+            latencies.append(elapsed * 1000)
+
+        percentiles = _percentiles(latencies)
+        print(f"{backend:>10}: fit {fit_time:6.2f} s, query p50 {percentiles['p50']:7.3f} ms, "
+              f"p95 {percentiles['p95']:7.3f} ms")
+
+
+def _misspell(term: str, rng: random.Random) -> str:
+    """Drop, double or swap one character of a term."""
+    i = rng.randrange(len(term) - 1)
+    edit = rng.choice(["drop", "double", "swap"])
+    if edit == "drop":
+        return term[:i] + term[i + 1:]
+    if edit == "double":
+        return term[:i] + term[i] + term[i:]
+    return term[:i] + term[i + 1] + term[i] + term[i + 2:]
+
+
+def bench_fuzzy(args):
+    """Measure building the term expander and expanding misspelled and truncated terms."""
+    rng = random.Random(42)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocabulary = set(WORDS)
+    while len(vocabulary) < args.terms:
+        vocabulary.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 12))))
+    terms = sorted(vocabulary)
+
+    expander, build_time = _timed(TermExpander, terms)
+    print(f"Vocabulary: {len(terms)} terms, expander built in {build_time:.2f} s")
+
+    samples = rng.sample(terms, args.queries)
+    cases = {
+        "misspelled": [_misspell(term, rng) for term in samples],
+        "prefix": [term[:max(3, len(term) - 3)] for term in samples],
+    }
+    for name, queries in cases.items():
+        latencies = []
+        found = 0
+        for query in queries:
+            matches, elapsed = _timed(expander.expand, query, args.width)
+            latencies.append(elapsed * 1000)
+            found += bool(matches)
+
+        percentiles = _percentiles(latencies)
+        print(f"{name:>10}: p50 {percentiles['p50']:.3f} ms, p95 {percentiles['p95']:.3f} ms, "
+              f"{found / len(queries):.0%} expanded")
+
+
+def bench_tokenize(args):
+    """Measure tokenization throughput of the markdown tokenizer against minsearch's token pattern."""
+    if args.zip_path:
+        texts = [doc['content'] for doc in load_docs_from_zip(args.zip_path)]
+    else:
+        rng = random.Random(42)
+        texts = [make_api_doc(rng) for _ in range(args.docs)]
+    text_mb = sum(len(text.encode('utf-8')) for text in texts) / 2**20
+    print(f"Corpus: {len(texts)} documents, {text_mb:.1f} MB of markdown")
+
+    variants = [
+        ("token pattern", lambda text: TOKEN_RE.findall(text.lower())),
+        ("tokenize", tokenize),
+        ("code symbols", code_symbols),
+    ]
+    for name, func in variants:
+        elapsed = min(_timed(lambda: [func(text) for text in texts])[1] for _ in range(args.repeat))
+        print(f"{name:>13}: {text_mb / elapsed:7.1f} MB/s")
+
+
+def bench_dense(args):
+    """Measure IVF build time, recall and latency against exhaustive search, and optionally a local model."""
+    rng = np.random.default_rng(42)
+    # Clustered unit vectors, closer to real embeddings than uniform noise
+    centers = rng.standard_normal((args.clusters, args.dim)).astype(np.float32)
+    vectors = centers[rng.integers(args.clusters, size=args.vectors)]
+    vectors += 0.5 * rng.standard_normal(vectors.shape).astype(np.float32)
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float16)
+    queries = vectors[rng.choice(args.vectors, args.queries, replace=False)].astype(np.float32)
+    queries += 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    print(f"Vectors: {args.vectors} x {args.dim} float16 ({vectors.nbytes / 2**20:.1f} MB), {args.queries} queries")
+
+    exact = vectors.astype(np.float32)
+    truth = [set(np.argsort(-(exact @ query))[:10]) for query in queries]
+
+    ann, build_time = _timed(IVFIndex, vectors)
+    if ann.centroids is None:
+        print(f"Exhaustive search (at most {EXACT_SEARCH_MAX} vectors)")
+    else:
+        print(f"IVF: {len(ann.centroids)} lists, built in {build_time:.2f} s")
+    for nprobe in args.nprobe:
+        ann.nprobe = nprobe
+        latencies = []
+        recall = 0
+        for query, expected in zip(queries, truth):
+            (ids, _), elapsed = _timed(ann.search, query, 10)
+            latencies.append(elapsed * 1000)
+            recall += len(expected & set(ids.tolist())) / 10
+        percentiles = _percentiles(latencies)
+        print(f"  nprobe {nprobe:3d}: recall@10 {recall / len(queries):.3f}, "
+              f"p50 {percentiles['p50']:.3f} ms, p95 {percentiles['p95']:.3f} ms")
+
+    if args.model:
+        embedder = Embedder(args.model)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            zip_path = make_synthetic_zip(os.path.join(tmp_dir, "docs.zip"), args.docs)
+            texts = [chunk['content'] for chunk in chunk_docs(load_docs_from_zip(zip_path))]
+        try:
+            _, embed_time = _timed(embedder.embed_documents, texts)
+        except RuntimeError as e:
+            sys.exit(str(e))
+        print(f"{args.model}: {len(texts) / embed_time:.0f} chunks/s")
+
+        latencies = []
+        for i in range(args.queries):
+            _, elapsed = _timed(embedder._embed_query, " ".join(random.Random(i).sample(WORDS, 3)))
+            latencies.append(elapsed * 1000)
+        percentiles = _percentiles(latencies)
+        print(f"  query embedding p50 {percentiles['p50']:.2f} ms, p95 {percentiles['p95']:.2f} ms")
+
+
+def bench_store(args):
+    """Compare resident index size and result formatting time with in-memory content vs a document store."""
+    queries = [" ".join(random.Random(i).sample(WORDS, 2)) for i in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        zip_path = make_synthetic_zip(os.path.join(tmp_dir, "docs.zip"), args.docs)
+        docs = load_docs_from_zip(zip_path)
+        text_mb = sum(len(doc['content'].encode('utf-8')) for doc in docs) / 2**20
+        print(f"Synthetic archive: {args.docs} documents, {text_mb:.1f} MB of markdown")
+
+        for backend in args.backends:
+            chunks = chunk_docs(docs)
+            in_memory = create_index(chunks, backend=backend)
+            store = DocumentStore.write(os.path.join(tmp_dir, f"{backend}.docs"), chunks)
+            compact = create_index(chunks, backend=backend, store_content=False)
+
+            for name, index, info in [("in memory", in_memory, {}), ("store", compact, {"store": store})]:
+                latencies = []
+                for query in queries:
+                    _, elapsed = _timed(lambda: server._format_results(server._with_content(info, search(index, query))))
+                    latencies.append(elapsed * 1000)
+
+                resident = index.memory_usage() + (store.nbytes() if info else 0)
+                print(f"{backend:>10} {name:>9}: resident {resident / 2**20:7.1f} MB, "
+                      f"search + format p50 {statistics.median(latencies):7.3f} ms")
+
+
+def _environment() -> dict:
+    """Describe the code and machine a suite run was measured on."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _throughput(index, queries: list[str], concurrency: int) -> float:
+    """Run every query once from concurrency threads and return the queries per second."""
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        list(pool.map(lambda query: search(index, query), queries))
+        elapsed = time.perf_counter() - start
+    return len(queries) / elapsed
+
+
+def _run_suite(args) -> list[dict]:
+    """Measure load, chunk and fit time, index size, query latency and throughput per corpus size and backend."""
+    queries = [" ".join(random.Random(i).sample(WORDS, 2)) for i in range(args.queries)]
+    runs = []
+
+    for num_docs in args.docs:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            zip_path = make_synthetic_zip(os.path.join(tmp_dir, "docs.zip"), num_docs, seed=args.seed)
+            zip_mb = os.path.getsize(zip_path) / 2**20
+            docs, load_time = _timed(load_docs_from_zip, zip_path, workers=args.workers)
+            chunks, chunk_time = _timed(chunk_docs, docs)
+        print(f"Corpus: {num_docs} documents, {len(chunks)} chunks, {zip_mb:.1f} MB zip")
+
+        for backend in args.backends:
+            index, fit_time = _timed(create_index, chunks, backend=backend)
+            # Warm up lazily computed state before timing queries
+            search(index, queries[0])
+
+            latencies = []
+            for query in queries:
+                _, elapsed = _timed(search, index, query)
+                latencies.append(elapsed * 1000)
+
+            run = {
+                "docs": num_docs,
+                "chunks": len(chunks),
+                "backend": backend,
+                "zip_mb": zip_mb,
+                "load_s": load_time,
+                "chunk_s": chunk_time,
+                "fit_s": fit_time,
+                "index_mb": index.memory_usage() / 2**20,
+                "latency_ms": _percentiles(latencies),
+                "throughput_qps": {str(c): _throughput(index, queries, c) for c in args.concurrency},
+            }
+            runs.append(run)
+
+            latency = run["latency_ms"]
+            throughput = ", ".join(f"x{c} {qps:,.0f}" for c, qps in run["throughput_qps"].items())
+            print(f"{backend:>10}: load {load_time:6.2f} s, fit {fit_time:6.2f} s, index {run['index_mb']:7.1f} MB, "
+                  f"p50/p95/p99 {latency['p50']:.3f}/{latency['p95']:.3f}/{latency['p99']:.3f} ms, "
+                  f"throughput {throughput} q/s")
+
+    return runs
+
+
+def _profiled(profiler: str | None, profile_output: str | None, func, *args):
+    """Run a function, optionally under cProfile or pyinstrument, and save the profile."""
+    if profiler is None:
+        return func(*args)
+
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            sys.exit("pyinstrument is not installed; run `uv pip install pyinstrument` or use --profile cprofile")
+
+        profile = Profiler()
+        profile.start()
+        try:
+            return func(*args)
+        finally:
+            profile.stop()
+            output = profile_output or "bench-profile.html"
+            with open(output, "w", encoding="utf-8") as f:
+                f.write(profile.output_html())
+            print(f"Profile written to {output}")
+
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, *args)
+    finally:
+        output = profile_output or "bench-profile.prof"
+        profile.dump_stats(output)
+        print(f"Profile written to {output} (open with snakeviz or python -m pstats)")
+        pstats.Stats(profile).sort_stats("cumulative").print_stats(15)
+
+
+def bench_suite(args):
+    """Run the full benchmark suite and optionally save machine-readable results."""
+    runs = _profiled(args.profile, args.profile_output, _run_suite, args)
+
+    results = {
+        "environment": _environment(),
+        "parameters": {
+            "docs": args.docs, "backends": args.backends, "queries": args.queries,
+            "concurrency": args.concurrency, "workers": args.workers, "seed": args.seed,
+        },
+        "runs": runs,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+# Metrics compared by bench_compare, where lower is better; throughput at each
+# concurrency level, where higher is better, is compared as well
+COMPARED_METRICS = (
+    "load_s", "chunk_s", "fit_s", "index_mb", "latency_ms.p50", "latency_ms.p95", "latency_ms.p99",
+)
+
+
+def _flatten_metrics(run: dict) -> dict:
+    """Return the compared metrics of a run, including throughput at each concurrency."""
+    metrics = {}
+    for name in COMPARED_METRICS:
+        value = run
+        for key in name.split("."):
+            value = value[key]
+        metrics[name] = value
+    for concurrency, qps in run["throughput_qps"].items():
+        metrics[f"throughput_qps.x{concurrency}"] = qps
+    return metrics
+
+
+def bench_compare(args):
+    """Compare two suite result files and flag metrics that regressed beyond a threshold."""
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    print(f"Baseline: {baseline['environment']['commit']} ({baseline['environment']['timestamp']})")
+    print(f"Current:  {current['environment']['commit']} ({current['environment']['timestamp']})")
+
+    baseline_runs = {(run["docs"], run["backend"]): run for run in baseline["runs"]}
+    regressions = 0
+
+    for run in current["runs"]:
+        key = (run["docs"], run["backend"])
+        if key not in baseline_runs:
+            continue
+
+        print(f"\n{run['backend']} with {run['docs']} documents:")
+        old_metrics = _flatten_metrics(baseline_runs[key])
+        for name, new in _flatten_metrics(run).items():
+            old = old_metrics.get(name)
+            if not old:
+                continue
+
+            change = (new - old) / old
+            higher_is_better = name.startswith("throughput_qps")
+            regressed = (-change if higher_is_better else change) > args.threshold
+            regressions += regressed
+            print(f"  {name:<22} {old:12.3f} -> {new:12.3f}  {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    cache_parser = subparsers.add_parser("cache", help="cold vs warm first-query latency")
+    cache_parser.add_argument("--docs", type=int, default=2000, help="number of documents in the synthetic zip")
+    cache_parser.add_argument("--query", default="websocket authentication", help="query to run")
+    cache_parser.add_argument("--repeat", type=int, default=3, help="number of repetitions")
+    cache_parser.set_defaults(func=bench_cache)
+
+    payload_parser = subparsers.add_parser("payload", help="response size of whole-file, chunk and snippet results")
+    payload_parser.add_argument("--docs", type=int, default=500, help="number of documents in the synthetic zip")
+    payload_parser.add_argument("--sections", type=int, default=40, help="number of sections per document")
+    payload_parser.add_argument("--queries", type=int, default=20, help="number of queries to run")
+    payload_parser.set_defaults(func=bench_payload)
+
+    parallel_parser = subparsers.add_parser("parallel", help="parallel zip decoding vs number of workers")
+    parallel_parser.add_argument("--docs", type=int, default=20000, help="number of documents in the synthetic zip")
+    parallel_parser.add_argument("--max-workers", type=int, default=None, help="largest worker count (default: CPU count)")
+    parallel_parser.add_argument("--repeat", type=int, default=3, help="number of repetitions")
+    parallel_parser.set_defaults(func=bench_parallel)
+
+    streaming_parser = subparsers.add_parser("streaming", help="peak RSS of list-based vs streaming index builds")
+    streaming_parser.add_argument("--docs", type=int, default=20000, help="number of documents in the synthetic zip")
+    streaming_parser.add_argument("--batch-size", type=int, default=1000, help="chunks per streaming batch")
+    streaming_parser.set_defaults(func=bench_streaming)
+
+    rss_parser = subparsers.add_parser("rss", help="build one index and report peak RSS")
+    rss_parser.add_argument("zip_path", help="zip file to index")
+    rss_parser.add_argument("--mode", choices=["list", "streaming"], default="list", help="how to build the index")
+    rss_parser.add_argument("--batch-size", type=int, default=1000, help="chunks per streaming batch")
+    rss_parser.set_defaults(func=bench_rss)
+
+    backends_parser = subparsers.add_parser("backends", help="fit time and query latency per search backend")
+    backends_parser.add_argument("--chunks", type=int, default=100000, help="approximate number of chunks")
+    backends_parser.add_argument("--queries", type=int, default=200, help="number of queries to run")
+    backends_parser.add_argument("--backends", nargs="*", choices=list(BACKENDS), help="backends to compare (default: all)")
+    backends_parser.set_defaults(func=bench_backends)
+
+    store_parser = subparsers.add_parser("store", help="resident size with in-memory content vs a document store")
+    store_parser.add_argument("--docs", type=int, default=20000, help="number of documents in the synthetic zip")
+    store_parser.add_argument("--queries", type=int, default=200, help="number of queries to run")
+    store_parser.add_argument("--backends", nargs="*", choices=list(BACKENDS), default=["minsearch", "tfidf"],
+                              help="backends to compare")
+    store_parser.set_defaults(func=bench_store)
+
+    fuzzy_parser = subparsers.add_parser("fuzzy", help="term expander build time and expansion latency")
+    fuzzy_parser.add_argument("--terms", type=int, default=100000, help="number of vocabulary terms")
+    fuzzy_parser.add_argument("--queries", type=int, default=1000, help="number of terms to expand")
+    fuzzy_parser.add_argument("--width", type=int, default=3, help="maximum matches per term")
+    fuzzy_parser.set_defaults(func=bench_fuzzy)
+
+    tokenize_parser = subparsers.add_parser("tokenize", help="tokenization throughput in MB/s")
+    tokenize_parser.add_argument("zip_path", nargs="?", help="zip file to tokenize (default: synthetic API docs)")
+    tokenize_parser.add_argument("--docs", type=int, default=2000, help="number of synthetic documents")
+    tokenize_parser.add_argument("--repeat", type=int, default=3, help="number of repetitions")
+    tokenize_parser.set_defaults(func=bench_tokenize)
+
+    dense_parser = subparsers.add_parser("dense", help="IVF recall and latency, and local model throughput")
+    dense_parser.add_argument("--vectors", type=int, default=100000, help="number of synthetic vectors")
+    dense_parser.add_argument("--dim", type=int, default=384, help="vector dimension")
+    dense_parser.add_argument("--clusters", type=int, default=1000, help="number of clusters in the synthetic vectors")
+    dense_parser.add_argument("--queries", type=int, default=200, help="number of queries to run")
+    dense_parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32], help="IVF lists scanned per query")
+    dense_parser.add_argument("--model", help="also measure this fastembed model (requires fastembed)")
+    dense_parser.add_argument("--docs", type=int, default=200, help="number of synthetic documents embedded with --model")
+    dense_parser.set_defaults(func=bench_dense)
+
+    suite_parser = subparsers.add_parser("suite", help="full benchmark suite with machine-readable output")
+    suite_parser.add_argument("--docs", type=int, nargs="+", default=[1000, 10000],
+                              help="numbers of documents in the synthetic zips")
+    suite_parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS),
+                              help="backends to measure (default: all)")
+    suite_parser.add_argument("--queries", type=int, default=500, help="number of queries to run")
+    suite_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4],
+                              help="numbers of concurrent query threads for the throughput test")
+    suite_parser.add_argument("--workers", type=int, default=1, help="zip decoding workers")
+    suite_parser.add_argument("--seed", type=int, default=42, help="random seed of the synthetic zips")
+    suite_parser.add_argument("--output", help="write results as JSON to this file")
+    suite_parser.add_argument("--profile", choices=["cprofile", "pyinstrument"], help="profile the suite")
+    suite_parser.add_argument("--profile-output", help="profile file (default: bench-profile.prof or .html)")
+    suite_parser.set_defaults(func=bench_suite)
+
+    compare_parser = subparsers.add_parser("compare", help="compare two suite result files")
+    compare_parser.add_argument("baseline", help="results of the reference commit")
+    compare_parser.add_argument("current", help="results to check")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="relative change counted as a regression (default: 0.1)")
+    compare_parser.set_defaults(func=bench_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
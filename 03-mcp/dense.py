@@ -0,0 +1,321 @@
+"""Optional dense retrieval: local embeddings, an IVF nearest neighbour index and reciprocal rank fusion."""
+
+import hashlib
+import os
+import threading
+from collections.abc import Callable
+from functools import lru_cache
+
+import numpy as np
+
+from search import FIELD_BOOSTS, SearchBackend
+
+DEFAULT_MODEL = "BAAI/bge-small-en-v1.5"
+
+# Indexes with at most this many vectors are searched exhaustively instead of through IVF lists
+EXACT_SEARCH_MAX = 4096
+
+# Number of IVF lists scanned per query
+DEFAULT_NPROBE = 8
+
+# Rank offset of reciprocal rank fusion; 60 is the value from the original RRF paper
+RRF_K = 60
+
+# Number of keyword and dense candidates fused per query, at least
+FUSION_CANDIDATES = 50
+
+
+class Embedder:
+    """
+    Embed texts with a small local model through fastembed (ONNX Runtime, CPU only).
+
+    fastembed is an optional dependency, imported and loaded the first time
+    something is embedded. Embeddings are L2-normalized, so dot products are
+    cosine similarities.
+
+    Attributes:
+        model_name (str): Name of the fastembed model.
+        batch_size (int): Number of texts embedded per model call.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, batch_size: int = 64):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+        self.embed_query = lru_cache(maxsize=1024)(self._embed_query)
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from fastembed import TextEmbedding
+                except ImportError:
+                    raise RuntimeError(
+                        "Dense retrieval needs fastembed; run `uv pip install fastembed` or unset DENSE_MODEL"
+                    ) from None
+                self._model = TextEmbedding(model_name=self.model_name)
+        return self._model
+
+    def embed_documents(self, texts: list[str]) -> np.ndarray:
+        """Embed passages, returning a float16 matrix with one normalized row per text."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float16)
+        vectors = np.vstack(list(self._load().passage_embed(texts, batch_size=self.batch_size)))
+        return _normalized(vectors).astype(np.float16)
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Embed a query, returning a normalized float32 vector; recent queries are cached."""
+        vector = next(iter(self._load().query_embed(query)))
+        return _normalized(vector[np.newaxis, :])[0]
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def text_key(text: str) -> int:
+    """Return the 64-bit key of a text in the embedding cache."""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def embed_cached(embed: Callable[[list[str]], np.ndarray], texts: list[str], cache_path: str | None) -> np.ndarray:
+    """
+    Embed texts, reusing the vectors of texts already embedded for the same archive.
+
+    The cache is a pair of .npy files: the float16 vectors and the 64-bit
+    hash of the text of each one. Texts are looked up by hash, so after an
+    incremental update only new or changed chunks are embedded. The cache
+    is rewritten with exactly the current texts whenever anything was
+    embedded.
+
+    Args:
+        embed: Function embedding a list of texts into a float16 matrix
+        texts: Texts to embed
+        cache_path: Path prefix of the cache files, or None to disable caching
+
+    Returns:
+        A float16 matrix with one row per text
+    """
+    keys = np.fromiter((text_key(text) for text in texts), dtype=np.uint64, count=len(texts))
+    vectors = None
+    missing = list(range(len(texts)))
+
+    if cache_path is not None:
+        try:
+            cached_keys = np.load(f"{cache_path}.keys.npy")
+            cached_vectors = np.load(f"{cache_path}.vectors.npy", mmap_mode='r')
+        except (OSError, ValueError):
+            cached_keys = cached_vectors = None
+
+        if cached_vectors is not None and len(cached_keys) == len(cached_vectors):
+            rows = {int(key): row for row, key in enumerate(cached_keys)}
+            vectors = np.empty((len(texts), cached_vectors.shape[1]), dtype=np.float16)
+            hits = [(i, rows[int(key)]) for i, key in enumerate(keys) if int(key) in rows]
+            if hits:
+                positions, cached_rows = map(np.array, zip(*hits))
+                vectors[positions] = cached_vectors[cached_rows]
+            missing = [i for i, key in enumerate(keys) if int(key) not in rows]
+            del cached_vectors
+
+    if missing or vectors is None:
+        new_vectors = embed([texts[i] for i in missing])
+        if vectors is None or vectors.shape[1] != new_vectors.shape[1]:
+            vectors = np.empty((len(texts), new_vectors.shape[1]), dtype=np.float16)
+        if missing:
+            vectors[missing] = new_vectors
+        if cache_path is not None:
+            _save_cache(cache_path, keys, vectors)
+
+    return vectors
+
+
+def _save_cache(cache_path: str, keys: np.ndarray, vectors: np.ndarray) -> bool:
+    """Write the cache files through temporary names, keys last, so a crash never leaves them mismatched."""
+    written = []
+    try:
+        for suffix, array in (("vectors", vectors), ("keys", keys)):
+            tmp_file = f"{cache_path}.{suffix}.{os.getpid()}.tmp.npy"
+            written.append(tmp_file)
+            np.save(tmp_file, array)
+            os.replace(tmp_file, f"{cache_path}.{suffix}.npy")
+    except OSError:
+        for tmp_file in written:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+        return False
+    return True
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest neighbour index over normalized float16 vectors.
+
+    Vectors are clustered with spherical k-means into about sqrt(n) lists,
+    and stored sorted by list so each list is one contiguous slice. A query
+    is compared with the centroids, and only the vectors of the nprobe
+    closest lists are converted to float32 and scored. Small indexes are
+    searched exhaustively over a float32 copy, which is at most a few
+    megabytes and saves converting every vector on every query.
+
+    Attributes:
+        vectors (np.ndarray): float16 vectors ordered by list, or float32 vectors for exhaustive search.
+        ids (np.ndarray): Original row of each vector in vectors.
+        centroids (np.ndarray | None): float32 list centroids, or None for exhaustive search.
+        offsets (np.ndarray): Start of each list in vectors; list i spans offsets[i]:offsets[i + 1].
+        nprobe (int): Number of lists scanned per query.
+    """
+
+    def __init__(self, vectors: np.ndarray, nprobe: int = DEFAULT_NPROBE, nlist: int | None = None,
+                 iterations: int = 10, seed: int = 0):
+        self.nprobe = nprobe
+        self.centroids = None
+
+        if len(vectors) <= EXACT_SEARCH_MAX:
+            self.ids = np.arange(len(vectors), dtype=np.int32)
+            self.vectors = vectors.astype(np.float32)
+            self.offsets = np.array([0, len(vectors)], dtype=np.int64)
+            return
+
+        nlist = nlist or int(np.sqrt(len(vectors)))
+        self.centroids = self._train(vectors, nlist, iterations, np.random.default_rng(seed))
+        lists = self._assign(vectors)
+        order = np.argsort(lists, kind='stable')
+        self.ids = order.astype(np.int32)
+        self.vectors = vectors[order]
+        self.offsets = np.searchsorted(lists[order], np.arange(nlist + 1)).astype(np.int64)
+
+    @staticmethod
+    def _train(vectors: np.ndarray, nlist: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+        """Fit spherical k-means centroids on a sample of at most 64 vectors per list."""
+        sample_size = min(len(vectors), nlist * 64)
+        sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))].astype(np.float32)
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)]
+
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~sums.any(axis=1)
+            # Empty lists are restarted on random sample vectors
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+            centroids = _normalized(sums)
+
+        return centroids
+
+    def _assign(self, vectors: np.ndarray, batch_size: int = 8192) -> np.ndarray:
+        """Return the list of every vector, converting to float32 one batch at a time."""
+        return np.concatenate([
+            np.argmax(vectors[start:start + batch_size].astype(np.float32) @ self.centroids.T, axis=1)
+            for start in range(0, len(vectors), batch_size)
+        ])
+
+    def search(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the vectors closest to a normalized query vector.
+
+        Returns:
+            The original rows and cosine similarities of at most k vectors, best first
+        """
+        if self.centroids is None:
+            rows = np.arange(len(self.vectors))
+            scores = self.vectors @ query
+        else:
+            nprobe = min(self.nprobe, len(self.centroids))
+            probes = np.argpartition(self.centroids @ query, -nprobe)[-nprobe:]
+            rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in probes])
+            scores = self.vectors[rows].astype(np.float32) @ query
+
+        if k < len(scores):
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return self.ids[rows[top]], scores[top]
+
+    def nbytes(self) -> int:
+        total = self.vectors.nbytes + self.ids.nbytes + self.offsets.nbytes
+        if self.centroids is not None:
+            total += self.centroids.nbytes
+        return total
+
+
+class DenseIndex:
+    """
+    Dense retrieval over the documents of one search index.
+
+    Row i of the vectors is the embedding of the index's document i, so
+    results can be fused with keyword results by position.
+
+    Attributes:
+        embedder (Embedder): Model embedding queries.
+        ann (IVFIndex): Nearest neighbour index over the document vectors.
+    """
+
+    def __init__(self, embedder: Embedder, vectors: np.ndarray, nprobe: int = DEFAULT_NPROBE):
+        self.embedder = embedder
+        self.ann = IVFIndex(vectors, nprobe=nprobe)
+
+    def __len__(self) -> int:
+        return len(self.ann.ids)
+
+    def search(self, query: str, k: int) -> np.ndarray:
+        """Return the positions of the k documents closest to the query, best first."""
+        if not len(self):
+            return np.zeros(0, dtype=np.int32)
+        return self.ann.search(self.embedder.embed_query(query), k)[0]
+
+    def nbytes(self) -> int:
+        """Return the memory used by the vectors and the ANN lists, in bytes."""
+        return self.ann.nbytes()
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = RRF_K) -> list[tuple[int, float]]:
+    """
+    Fuse rankings by summing 1 / (k + rank) for every ranking an item appears in.
+
+    Only ranks are used, so keyword and cosine scores of different scales
+    need no normalization.
+
+    Returns:
+        (item, fused score) pairs, best first
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+def hybrid_search(index: SearchBackend, dense: DenseIndex, query: str, num_results: int = 5,
+                  output_scores: bool = False, keyword_query: str | None = None) -> list[dict]:
+    """
+    Search with keywords and embeddings and fuse both rankings with RRF.
+
+    Args:
+        index: The fitted search backend
+        dense: Dense index over the same documents, in the same order
+        query: Search query string, embedded as is
+        num_results: Number of results to return
+        output_scores: Add the fused score of each result as a '_score' field
+        keyword_query: Query for the keyword side, e.g. after fuzzy expansion (default: query)
+
+    Returns:
+        List of matching documents
+    """
+    candidates = max(FUSION_CANDIDATES, num_results)
+    keyword_results = index.search(keyword_query or query, num_results=candidates, boost_dict=FIELD_BOOSTS,
+                                   output_ids=True)
+    keyword_ranking = [result['_id'] for result in keyword_results]
+    dense_ranking = [int(position) for position in dense.search(query, candidates)]
+
+    results = []
+    for position, score in reciprocal_rank_fusion([keyword_ranking, dense_ranking])[:num_results]:
+        if output_scores:
+            results.append({**index.docs[position], '_score': score})
+        else:
+            results.append(index.docs[position])
+    return results
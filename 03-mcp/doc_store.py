@@ -0,0 +1,135 @@
+"""Compact, memory-mapped store of chunk text, addressed by integer document id."""
+
+import mmap
+import os
+from collections.abc import Iterable
+
+import numpy as np
+
+
+class DocumentStoreWriter:
+    """
+    Write chunk contents one after another into a new document store file.
+
+    Each chunk's content is appended as UTF-8 and the chunk is given a
+    'doc_id' field pointing at it. The file is written under a temporary
+    name and only appears at its final path once close() is called.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tmp_path = f"{path}.{os.getpid()}.tmp"
+        self._file = open(self._tmp_path, 'wb')
+        self._offsets = [0]
+
+    def append(self, text: str) -> int:
+        """Append one text and return its document id."""
+        self._offsets.append(self._offsets[-1] + self._file.write(text.encode('utf-8')))
+        return len(self._offsets) - 2
+
+    def add(self, chunks: Iterable[dict]) -> None:
+        """Append the content of every chunk and record it as the chunk's 'doc_id'."""
+        for chunk in chunks:
+            chunk['doc_id'] = self.append(chunk['content'])
+
+    def close(self) -> "DocumentStore":
+        """Finish the file and return the store reading it."""
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return DocumentStore(self.path, np.array(self._offsets, dtype=np.int64))
+
+    def abort(self) -> None:
+        """Discard the partially written file."""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class DocumentStore:
+    """
+    Read-only store of texts concatenated in a single memory-mapped file.
+
+    Only the offsets array lives on the Python heap; the text itself stays
+    in the page cache and is decoded lazily, one document at a time, for
+    the results that are actually returned.
+
+    Stores pickle as their path and offsets, so they can be saved in the
+    index cache and reopened later. Unpickling fails if the file is missing
+    or has a different size, which the index cache treats as a miss.
+
+    Attributes:
+        path (str): Path of the store file.
+        offsets (np.ndarray): Byte offsets of each document; document i spans
+                              offsets[i]:offsets[i + 1].
+    """
+
+    def __init__(self, path: str, offsets: np.ndarray):
+        self.path = path
+        self.offsets = offsets
+        self._mmap = None
+
+    @classmethod
+    def write(cls, path: str, chunks: Iterable[dict]) -> "DocumentStore":
+        """
+        Write the content of chunks to a new store, setting each chunk's 'doc_id'.
+
+        Args:
+            path: Path of the store file to create
+            chunks: Chunks with a 'content' field
+
+        Returns:
+            The new store
+        """
+        writer = DocumentStoreWriter(path)
+        try:
+            writer.add(chunks)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.close()
+
+    def _open(self) -> mmap.mmap | None:
+        if self._mmap is None and self.offsets[-1] > 0:
+            with open(self.path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def get(self, doc_id: int) -> str:
+        """Return the text of one document."""
+        start, end = self.offsets[doc_id], self.offsets[doc_id + 1]
+        if start == end:
+            return ''
+        return self._open()[start:end].decode('utf-8')
+
+    def get_many(self, doc_ids: Iterable[int]) -> list[str]:
+        """Return the texts of several documents, in the same order."""
+        return [self.get(doc_id) for doc_id in doc_ids]
+
+    def nbytes(self) -> int:
+        """Return the heap memory used by the store (the mapped text is not counted)."""
+        return self.offsets.nbytes
+
+    def file_size(self) -> int:
+        """Return the size of the text on disk, in bytes."""
+        return int(self.offsets[-1])
+
+    def delete(self) -> None:
+        """Remove the store file; this store, and copies sharing its mapping, stay readable."""
+        try:
+            self._open()
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __getstate__(self) -> dict:
+        return {'path': self.path, 'offsets': self.offsets}
+
+    def __setstate__(self, state: dict) -> None:
+        if os.path.getsize(state['path']) != state['offsets'][-1]:
+            raise ValueError(f"Document store {state['path']} does not match its offsets")
+        self.path = state['path']
+        self.offsets = state['offsets']
+        self._mmap = None
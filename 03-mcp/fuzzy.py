@@ -0,0 +1,134 @@
+"""Prefix and fuzzy expansion of query terms over an index's vocabulary."""
+
+import weakref
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Iterable
+
+from search import SearchBackend, tokenize
+
+# Unknown terms at least this long are first expanded as prefixes (e.g. 'too' -> 'tool')
+MIN_PREFIX_LENGTH = 3
+
+# Minimum Dice similarity of trigram sets for a fuzzy match (e.g. 'websockt' -> 'websocket')
+MIN_SIMILARITY = 0.5
+
+# Number of prefix matches considered before keeping the shortest ones
+MAX_PREFIX_CANDIDATES = 256
+
+
+def _trigrams(term: str) -> set[str]:
+    """Return the trigrams of a term padded with '$', so short terms and word edges count."""
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TermExpander:
+    """
+    Sorted term list and trigram index over a vocabulary.
+
+    Prefix matches are found by bisecting the sorted terms. Fuzzy matches are
+    found by counting the trigrams a query term shares with each vocabulary
+    term through the trigram postings, so only terms sharing at least one
+    trigram are ever scored.
+
+    Attributes:
+        terms (list): Vocabulary terms, sorted.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = sorted(terms)
+        self._known = set(self.terms)
+        self._postings: dict[str, list[int]] = {}
+        self._gram_counts = []
+
+        for term_id, term in enumerate(self.terms):
+            grams = _trigrams(term)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(term_id)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._known
+
+    def prefix_matches(self, prefix: str, limit: int) -> list[str]:
+        """Return up to limit of the shortest terms starting with prefix."""
+        start = bisect_left(self.terms, prefix)
+        candidates = []
+        for term in self.terms[start:start + MAX_PREFIX_CANDIDATES]:
+            if not term.startswith(prefix):
+                break
+            candidates.append(term)
+        return sorted(candidates, key=lambda term: (len(term), term))[:limit]
+
+    def fuzzy_matches(self, term: str, limit: int) -> list[str]:
+        """Return up to limit of the terms most similar to term, best first."""
+        grams = _trigrams(term)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        scored = []
+        for term_id, count in shared.items():
+            similarity = 2 * count / (len(grams) + self._gram_counts[term_id])
+            if similarity >= MIN_SIMILARITY:
+                scored.append((-similarity, self.terms[term_id]))
+
+        scored.sort()
+        return [match for _, match in scored[:limit]]
+
+    def expand(self, term: str, limit: int) -> list[str]:
+        """Return the terms an unknown term expands to: prefix matches, or else fuzzy matches."""
+        matches = self.prefix_matches(term, limit) if len(term) >= MIN_PREFIX_LENGTH else []
+        return matches or self.fuzzy_matches(term, limit)
+
+
+# Term expanders of live indexes, with the vocabulary size they were built for
+_expanders: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def term_expander(index: SearchBackend) -> TermExpander:
+    """Return the term expander of an index, building it again if the vocabulary grew."""
+    cached = _expanders.get(index)
+    if cached is None or cached[0] != len(index.vocabulary):
+        cached = (len(index.vocabulary), TermExpander(index.vocabulary))
+        _expanders[index] = cached
+    return cached[1]
+
+
+def expand_query(index: SearchBackend, query: str, width: int) -> tuple[str, dict[str, list[str]]]:
+    """
+    Replace query terms that are not in the index's vocabulary with close matches.
+
+    Terms the index knows are kept as they are. An unknown term is replaced
+    by up to width vocabulary terms it is a prefix of (shortest first), or,
+    if there are none, by up to width terms with similar trigrams.
+
+    Args:
+        index: The fitted search backend
+        query: Search query string
+        width: Maximum number of terms each unknown term expands to (0 disables expansion)
+
+    Returns:
+        The expanded query and a mapping of each expanded term to its replacements
+    """
+    terms = tokenize(query)
+    if width <= 0 or all(term in index.vocabulary for term in terms):
+        return query, {}
+
+    expander = term_expander(index)
+    expanded_terms = []
+    expansions = {}
+    for term in terms:
+        if term in expander:
+            expanded_terms.append(term)
+            continue
+
+        matches = expander.expand(term, width)
+        if matches:
+            expansions[term] = matches
+            expanded_terms.extend(matches)
+
+    if not expansions:
+        return query, {}
+    return " ".join(expanded_terms), expansions
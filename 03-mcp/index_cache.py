@@ -0,0 +1,195 @@
+"""On-disk cache of fitted search indexes, keyed by zip archive fingerprint."""
+
+import hashlib
+import os
+import pickle
+import uuid
+import zipfile
+
+# Bump whenever the structure of cached entries changes
+CACHE_VERSION = 7
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".index_cache")
+
+
+def get_cache_dir() -> str | None:
+    """
+    Return the index cache directory.
+
+    Set INDEX_CACHE_DIR to override the location, or to an empty string
+    to disable the cache entirely.
+    """
+    cache_dir = os.environ.get("INDEX_CACHE_DIR", DEFAULT_CACHE_DIR)
+    return cache_dir or None
+
+
+def zip_fingerprint(zip_path: str) -> dict:
+    """
+    Compute the cache key of a zip file.
+
+    The content hash covers the name, CRC-32 and size of every member, taken
+    from the central directory, so it changes whenever any member changes
+    without having to decompress the archive.
+
+    Args:
+        zip_path: Normalized path to the zip file
+
+    Returns:
+        Dictionary with 'path', 'size', 'mtime_ns' and 'content_hash' fields
+    """
+    stat = os.stat(zip_path)
+    digest = hashlib.sha256()
+
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        for file_info in zf.infolist():
+            digest.update(f"{file_info.filename}\0{file_info.CRC}\0{file_info.file_size}\n".encode('utf-8'))
+
+    return {
+        "path": zip_path,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "content_hash": digest.hexdigest(),
+    }
+
+
+def _cache_file(cache_dir: str, zip_path: str) -> str:
+    """Return the cache file used for a zip path."""
+    name = hashlib.sha256(zip_path.encode('utf-8')).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{name}.pkl")
+
+
+def new_store_path(zip_path: str) -> str | None:
+    """
+    Return a new, unique path for the document store of a zip file.
+
+    Stores live next to the cache file of their zip. Every rebuild gets a
+    fresh name, so a store that is still mapped is never overwritten.
+
+    Returns:
+        The path, or None if the cache is disabled
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return None
+
+    os.makedirs(cache_dir, exist_ok=True)
+    stem = os.path.splitext(_cache_file(cache_dir, zip_path))[0]
+    return f"{stem}.{uuid.uuid4().hex[:12]}.docs"
+
+
+def embedding_cache_path(zip_path: str, model_name: str) -> str | None:
+    """
+    Return the path prefix of the embedding cache of a zip file for one model.
+
+    Returns:
+        The prefix (see dense.embed_cached), or None if the cache is disabled
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return None
+
+    os.makedirs(cache_dir, exist_ok=True)
+    stem = os.path.splitext(_cache_file(cache_dir, zip_path))[0]
+    model = hashlib.sha256(model_name.encode('utf-8')).hexdigest()[:12]
+    return f"{stem}.{model}.emb"
+
+
+def load_cached_index(zip_path: str, fingerprint: dict | None = None) -> dict | None:
+    """
+    Load a cached index entry for a zip file.
+
+    Args:
+        zip_path: Normalized path to the zip file
+        fingerprint: Current fingerprint of the zip file (see zip_fingerprint),
+                     or None to return the cached entry even if it is out of date
+
+    Returns:
+        The cached registry entry, or None if there is no valid cache entry
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return None
+
+    try:
+        with open(_cache_file(cache_dir, zip_path), 'rb') as f:
+            payload = pickle.load(f)
+    except Exception:
+        # Missing, corrupt or unreadable cache files are treated as a miss
+        return None
+
+    if payload.get("version") != CACHE_VERSION:
+        return None
+
+    if fingerprint is not None and payload.get("fingerprint") != fingerprint:
+        return None
+
+    return payload["entry"]
+
+
+def save_cached_index(zip_path: str, fingerprint: dict, entry: dict) -> bool:
+    """
+    Save an index entry to the cache.
+
+    The file is written to a temporary name and then renamed, so a crash
+    never leaves a partially written cache file behind.
+
+    Args:
+        zip_path: Normalized path to the zip file
+        fingerprint: Fingerprint of the zip file the entry was built from
+        entry: Registry entry to cache
+
+    Returns:
+        True if the entry was written, False if caching is disabled or failed
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return False
+
+    cache_file = _cache_file(cache_dir, zip_path)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    payload = {"version": CACHE_VERSION, "fingerprint": fingerprint, "entry": entry}
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return False
+
+    return True
+
+
+def invalidate_cache(zip_path: str | None = None) -> int:
+    """
+    Remove cached index entries, their document stores and their embeddings.
+
+    Args:
+        zip_path: Normalized path of the zip file to invalidate, or None to clear the whole cache
+
+    Returns:
+        Number of cache files removed
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None or not os.path.isdir(cache_dir):
+        return 0
+
+    if zip_path is not None:
+        prefix = os.path.basename(os.path.splitext(_cache_file(cache_dir, zip_path))[0]) + "."
+    else:
+        prefix = ""
+
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if not name.startswith(prefix) or not name.endswith(('.pkl', '.docs', '.npy')):
+            continue
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except FileNotFoundError:
+            continue
+        if name.endswith('.pkl'):
+            removed += 1
+
+    return removed
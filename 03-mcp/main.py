@@ -1,20 +1,148 @@
+import asyncio
+import hashlib
+import logging
 import os
-import requests
+import tempfile
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
 from fastmcp import FastMCP
-from search import load_docs_from_zip, create_index, search
+from page_fetcher import DEFAULT_READER_URL, PageCache, PageFetcher
+from search import (
+    DEFAULT_INCLUDE, DEFAULT_EXCLUDE, load_docs_from_zip, iter_docs_from_zip, zip_member_crcs, zip_docs_size,
+    scan_dir, load_docs_from_dir, chunk_docs, create_index, create_index_streaming, search, SearchBackend,
+)
+from fuzzy import expand_query
+from dense import DenseIndex, Embedder, embed_cached, hybrid_search
+from doc_store import DocumentStore, DocumentStoreWriter
+from index_cache import (
+    zip_fingerprint, load_cached_index, save_cached_index, invalidate_cache, new_store_path, embedding_cache_path,
+)
+from metrics import Metrics, MetricsExporter
+from query_cache import QueryCache
+from registry import IndexRegistry
+from snippets import extract_snippet
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP):
+    """Start warm-loading the archives listed in PRELOAD_ZIPS and exporting metrics as soon as the server starts."""
+    preload_zips(PRELOAD_ZIPS)
+    if metrics_exporter is not None:
+        metrics_exporter.start()
+    try:
+        yield {}
+    finally:
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+
+
+mcp = FastMCP("Context7 Clone", lifespan=_lifespan)
+
+# Registry of loaded zip files and their search indexes, bounded by INDEX_MEMORY_BUDGET_MB
+# (0 for no limit). Least recently used archives are evicted and reloaded on their next lookup.
+# Key: zip file path (normalized), Value: {"index": SearchBackend, "backend": str, "doc_count": int,
+#   "chunk_count": int, "fingerprint": dict, "members": {member name: CRC-32}, "stale_count": int,
+#   "store": DocumentStore holding the chunk text, "dense": DenseIndex or None, "resident_bytes": int}.
+# Directories loaded with load_dir are registered the same way, with "source": "dir", their
+# include/exclude globs as fingerprint and {relative path: (mtime_ns, size)} as members.
+loaded_indexes = IndexRegistry(memory_budget=int(float(os.environ.get("INDEX_MEMORY_BUDGET_MB", "1024")) * 1024 * 1024))
+
+# Zip files loaded in the background at startup, separated by os.pathsep (':' on Linux and macOS)
+PRELOAD_ZIPS = [path for path in os.environ.get("PRELOAD_ZIPS", "").split(os.pathsep) if path]
+
+# Zip indexes are built and updated by these background threads. Concurrent loads of the
+# same zip share one future, so an archive is never built twice at the same time.
+index_loader = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("INDEX_LOADER_WORKERS", "2")),
+    thread_name_prefix="index-loader"
+)
+_loading: dict[str, Future] = {}
+_loading_lock = threading.Lock()
+
+# Directories loaded with watch=True are polled for changes every DIR_WATCH_INTERVAL seconds
+# by a background thread, until they are deleted or evicted
+DIR_WATCH_INTERVAL = float(os.environ.get("DIR_WATCH_INTERVAL", "0.5"))
+_watchers: dict[str, threading.Thread] = {}
+
+# Search backend: 'minsearch', or the built-in sparse engine with 'tfidf' or 'bm25' weighting
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "minsearch")
+
+# Parallel decoding of zip members: number of workers and 'thread' or 'process' pool
+LOAD_WORKERS = int(os.environ.get("ZIP_LOAD_WORKERS", "1"))
+LOAD_EXECUTOR = os.environ.get("ZIP_LOAD_EXECUTOR", "thread")
+
+# Archives whose markdown exceeds this many uncompressed megabytes are indexed
+# in bounded-memory batches, and their text is read back from the zip per result
+STREAMING_INDEX_MB = float(os.environ.get("STREAMING_INDEX_MB", "512"))
+
+# Recent search_docs responses; entries of a zip are dropped whenever its index changes
+query_cache = QueryCache(maxsize=int(os.environ.get("QUERY_CACHE_SIZE", "256")))
+
+# Fully rebuild an index once incremental updates have touched more than this
+# fraction of its documents, so the vocabulary and IDF weights catch up
+REBUILD_RATIO = 0.5
+
+# Tool latencies and output sizes, index build and search timings, cache counters and resident
+# sizes, reported by server_stats. Set METRICS_FILE to also export them every METRICS_INTERVAL
+# seconds, as Prometheus text (METRICS_FORMAT=prometheus) or appended JSON lines (jsonl).
+metrics = Metrics()
+_metrics_file = os.environ.get("METRICS_FILE", "")
+metrics_exporter = MetricsExporter(
+    metrics, _metrics_file,
+    fmt=os.environ.get("METRICS_FORMAT", "prometheus"),
+    interval=float(os.environ.get("METRICS_INTERVAL", "15"))
+) if _metrics_file else None
+
+# Fetched pages are cached on disk for PAGE_CACHE_TTL seconds, then revalidated with
+# their ETag/Last-Modified; set PAGE_CACHE_DIR to an empty string to disable the cache
+_page_cache_dir = os.environ.get("PAGE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".page_cache"))
+page_fetcher = PageFetcher(
+    reader_url=os.environ.get("JINA_READER_URL", DEFAULT_READER_URL),
+    timeout=float(os.environ.get("FETCH_TIMEOUT", "30")),
+    max_connections=int(os.environ.get("FETCH_MAX_CONNECTIONS", "10")),
+    cache=PageCache(_page_cache_dir, ttl=float(os.environ.get("PAGE_CACHE_TTL", "3600"))) if _page_cache_dir else None,
+    metrics=metrics
+)
 
-mcp = FastMCP("Context7 Clone")
+# Fetched pages can be added to named page indexes, registered under this prefix
+# next to the zip files. Persisted page indexes are stored in the index cache.
+PAGE_INDEX_PREFIX = "pages:"
 
-# Registry of loaded zip files and their search indexes
-# Key: zip file path (normalized), Value: {"index": Index, "doc_count": int}
-loaded_indexes: dict = {}
+# Search results are cut to a query-aware snippet of at most this many characters
+# by default, and no more than MAX_RESULTS results are returned per query
+DEFAULT_SNIPPET_CHARS = 1000
+MAX_RESULTS = 50
 
+# Query terms missing from an index's vocabulary are replaced by up to this many
+# prefix or fuzzy matches (0 disables expansion)
+FUZZY_EXPANSION = int(os.environ.get("FUZZY_EXPANSION", "3"))
 
-def fetch_page_content(url: str) -> str:
+# Hybrid retrieval: zip archives are also embedded with this local fastembed model (e.g.
+# BAAI/bge-small-en-v1.5), and keyword and dense results are fused; empty disables it
+DENSE_MODEL = os.environ.get("DENSE_MODEL", "")
+dense_embedder = Embedder(DENSE_MODEL) if DENSE_MODEL else None
+
+# Thread pool running searches off the event loop; search_all queries the loaded indexes on it concurrently
+search_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SEARCH_ALL_WORKERS", "4")),
+    thread_name_prefix="search-all"
+)
+
+
+async def fetch_page_content(url: str) -> str:
     """
     Fetch the content of a web page and return it as markdown.
 
     Uses Jina Reader to convert any web page to clean markdown format.
+    Requests share a pooled HTTP client, and responses are cached on disk.
 
     Args:
         url: The URL of the web page to fetch (e.g., https://example.com)
@@ -22,26 +150,70 @@ def fetch_page_content(url: str) -> str:
     Returns:
         The page content in markdown format
     """
-    jina_url = f"https://r.jina.ai/{url}"
-    response = requests.get(jina_url)
-    response.raise_for_status()
-    return response.text
+    return await page_fetcher.fetch(url)
 
 
 @mcp.tool
-def fetch_page(url: str) -> str:
+@metrics.instrument
+async def fetch_page(url: str, index_name: str = "", persist: bool = False) -> str:
     """
     Fetch the content of a web page and return it as markdown.
 
     Uses Jina Reader to convert any web page to clean markdown format.
+    Pass an index_name to also add the page to a named page index, which
+    can then be searched with search_docs without fetching it again.
 
     Args:
         url: The URL of the web page to fetch (e.g., https://example.com)
+        index_name: Name of the page index to add the page to (default: don't index)
+        persist: Keep the page index on disk across server restarts
 
     Returns:
         The page content in markdown format
     """
-    return fetch_page_content(url)
+    content = await fetch_page_content(url)
+    if not index_name:
+        return content
+
+    info = _ingest_pages(index_name, {url: content}, persist=persist)
+    return f"{content}\n\n---\n\n{_format_ingest_summary(index_name, info)}"
+
+
+@mcp.tool
+@metrics.instrument
+async def fetch_pages(urls: list[str], max_concurrency: int = 5, index_name: str = "", persist: bool = False) -> str:
+    """
+    Fetch several web pages concurrently and return them as markdown.
+
+    A page that fails to load is reported inline and does not fail the others.
+    Pass an index_name to also add the fetched pages to a named page index.
+
+    Args:
+        urls: The URLs of the web pages to fetch
+        max_concurrency: Maximum number of pages fetched at the same time (default: 5)
+        index_name: Name of the page index to add the pages to (default: don't index)
+        persist: Keep the page index on disk across server restarts
+
+    Returns:
+        The content of each page in markdown format, under a heading with its URL
+    """
+    results = await page_fetcher.fetch_many(urls, max_concurrency=max_concurrency)
+
+    summary = None
+    if index_name:
+        pages = {url: result for url, result in results.items() if not isinstance(result, Exception)}
+        summary = _format_ingest_summary(index_name, _ingest_pages(index_name, pages, persist=persist))
+
+    output = []
+    for url, result in results.items():
+        if isinstance(result, Exception):
+            output.append(f"# {url}\n\nError fetching page: {result}")
+        else:
+            output.append(f"# {url}\n\n{result}")
+    if summary:
+        output.append(summary)
+
+    return "\n\n---\n\n".join(output)
 
 
 def _normalize_path(zip_path: str) -> str:
@@ -49,26 +221,516 @@ def _normalize_path(zip_path: str) -> str:
     return os.path.normpath(os.path.abspath(zip_path))
 
 
-def _load_zip_index(zip_path: str) -> dict:
-    """Load a zip file and create its search index if not already loaded."""
+_store_tmp_dir = None
+
+
+def _new_store_path(zip_path: str) -> str:
+    """Return a path for a new document store, in a temporary directory if the index cache is disabled."""
+    global _store_tmp_dir
+
+    path = new_store_path(zip_path)
+    if path is None:
+        if _store_tmp_dir is None:
+            _store_tmp_dir = tempfile.TemporaryDirectory(prefix="03-mcp-docs-")
+        path = os.path.join(_store_tmp_dir.name, f"{uuid.uuid4().hex}.docs")
+    return path
+
+
+def _index_chunks(key: str, docs: list[dict]) -> tuple[SearchBackend, DocumentStore]:
+    """Chunk documents, write their text to a new document store and fit an index over the rest."""
+    chunks = chunk_docs(docs)
+    store = DocumentStore.write(_new_store_path(key), chunks)
+    return create_index(chunks, backend=SEARCH_BACKEND, store_content=False), store
+
+
+def _build_zip_index(zip_path: str, fingerprint: dict) -> dict:
+    """
+    Load every document of a zip file and fit a new search index.
+
+    Chunk text is written to a memory-mapped document store, and the index
+    itself only keeps each chunk's metadata and 'doc_id'.
+    """
+    members = zip_member_crcs(zip_path)
+
+    if zip_docs_size(zip_path) > STREAMING_INDEX_MB * 1024 * 1024:
+        # minsearch cannot be fitted in batches; stream into the built-in engine instead
+        weighting = "bm25" if SEARCH_BACKEND == "bm25" else "tfidf"
+        writer = DocumentStoreWriter(_new_store_path(zip_path))
+        try:
+            index = create_index_streaming(iter_docs_from_zip(zip_path), weighting=weighting, store_writer=writer)
+        except BaseException:
+            writer.abort()
+            raise
+        store = writer.close()
+    else:
+        docs = load_docs_from_zip(zip_path, workers=LOAD_WORKERS, executor=LOAD_EXECUTOR)
+        index, store = _index_chunks(zip_path, docs)
+
+    return {
+        "index": index,
+        "backend": SEARCH_BACKEND,
+        "doc_count": len(members),
+        "chunk_count": len(index.docs),
+        "fingerprint": fingerprint,
+        "members": members,
+        "stale_count": 0,
+        "store": store
+    }
+
+
+def _update_zip_index(entry: dict, zip_path: str, fingerprint: dict) -> dict:
+    """
+    Bring a loaded index up to date with a zip file that changed on disk.
+
+    Members are diffed by the CRC-32 recorded in the central directory, and
+    only added, changed or removed members are re-parsed and re-indexed.
+    The document store is rewritten with the remaining chunks followed by
+    the new ones, so document ids stay equal to index positions.
+    """
+    members = zip_member_crcs(zip_path)
+    entry = _apply_changes(
+        entry, zip_path, members,
+        load_changed=lambda changed: load_docs_from_zip(
+            zip_path, members=changed, workers=LOAD_WORKERS, executor=LOAD_EXECUTOR
+        ),
+        rebuild=partial(_build_zip_index, zip_path, fingerprint)
+    )
+    return {**entry, "fingerprint": fingerprint}
+
+
+def _apply_changes(entry: dict, key: str, members: dict, load_changed: Callable[[list[str]], list[dict]],
+                   rebuild: Callable[[], dict]) -> dict:
+    """
+    Re-index the members of a zip file or directory whose CRC-32 or mtime changed.
+
+    Falls back to rebuild() once more than REBUILD_RATIO of the members have
+    been updated incrementally since the last full build.
+
+    Args:
+        entry: Loaded registry entry
+        key: Registry key of the source
+        members: Current members, mapped to the value that changes with their content
+        load_changed: Function loading the documents of the given added or changed members
+        rebuild: Function building the entry from scratch
+
+    Returns:
+        The updated entry
+    """
+    old_members = entry["members"]
+    changed = [name for name, version in members.items() if old_members.get(name) != version]
+    removed = [name for name in old_members if name not in members]
+
+    stale_count = entry["stale_count"] + len(changed) + len(removed)
+    if stale_count > len(members) * REBUILD_RATIO:
+        return rebuild()
+
+    index = entry["index"]
+    index.remove(set(changed + removed))
+    new_chunks = chunk_docs(load_changed(changed)) if changed else []
+
+    old_store = entry["store"]
+    writer = DocumentStoreWriter(_new_store_path(key))
+    try:
+        for doc in index.docs:
+            writer.append(old_store.get(doc['doc_id']))
+        writer.add(new_chunks)
+    except BaseException:
+        writer.abort()
+        raise
+    store = writer.close()
+
+    for doc_id, doc in enumerate(index.docs):
+        doc['doc_id'] = doc_id
+    index.add(new_chunks)
+
+    return {
+        **entry,
+        "doc_count": len(members),
+        "chunk_count": len(index.docs),
+        "members": members,
+        "stale_count": stale_count,
+        "store": store,
+        # Document positions changed; rebuilt from the embedding cache by _with_dense
+        "dense": None
+    }
+
+
+def _with_dense(entry: dict, normalized_path: str) -> dict:
+    """
+    Add the dense index of a zip entry, if hybrid retrieval is enabled.
+
+    Chunks are embedded with their heading path. Vectors are cached on disk
+    per archive and model, so after the first build only new or changed
+    chunks go through the model.
+    """
+    if dense_embedder is None or entry.get("dense") is not None:
+        return entry
+
+    store = entry["store"]
+    texts = [f"{doc.get('section', '')}\n{store.get(doc['doc_id'])}" for doc in entry["index"].docs]
+    with metrics.timer("index_build_seconds", source=normalized_path, stage="embed"):
+        vectors = embed_cached(dense_embedder.embed_documents, texts, embedding_cache_path(normalized_path, DENSE_MODEL))
+    return {**entry, "dense": DenseIndex(dense_embedder, vectors)}
+
+
+def _cacheable(entry: dict) -> dict:
+    """Return an entry without its dense index, which is rebuilt from the embedding cache instead of pickled."""
+    return {key: value for key, value in entry.items() if key != "dense"}
+
+
+def _current_entry(normalized_path: str) -> dict | None:
+    """Return the loaded entry of a zip file if its size and modification time still match."""
+    try:
+        stat = os.stat(normalized_path)
+    except FileNotFoundError:
+        return None
+
+    entry = loaded_indexes.get(normalized_path)
+    if entry is not None and entry["fingerprint"]["size"] == stat.st_size \
+            and entry["fingerprint"]["mtime_ns"] == stat.st_mtime_ns:
+        return entry
+    return None
+
+
+def _refresh_zip_index(normalized_path: str, zip_path: str) -> dict:
+    """
+    Load a zip file and create its search index if not already loaded.
+
+    If the archive changed on disk, the index is updated incrementally.
+    Indexes are cached on disk (see index_cache), so a restarted server
+    skips decoding and fitting for archives that have not changed.
+    Runs in the index_loader pool; use _zip_index_future to call it.
+    """
+    if not os.path.exists(normalized_path):
+        loaded_indexes.pop(normalized_path, None)
+        raise FileNotFoundError(f"Zip file not found: {zip_path}")
+
+    entry = _current_entry(normalized_path)
+    if entry is not None:
+        # Loaded by an earlier call while this one was queued
+        return entry
+
+    entry = loaded_indexes.get(normalized_path)
+
+    fingerprint = zip_fingerprint(normalized_path)
+    if entry is None:
+        with metrics.timer("index_build_seconds", source=normalized_path, stage="cache_load"):
+            entry = load_cached_index(normalized_path)
+    old_store = entry["store"] if entry is not None else None
+
+    if entry is None or entry["backend"] != SEARCH_BACKEND:
+        with metrics.timer("index_build_seconds", source=normalized_path, stage="build"):
+            entry = _build_zip_index(normalized_path, fingerprint)
+        save_cached_index(normalized_path, fingerprint, _cacheable(entry))
+        query_cache.invalidate(normalized_path)
+    elif entry["fingerprint"] != fingerprint:
+        if entry["fingerprint"]["content_hash"] == fingerprint["content_hash"]:
+            # Touched or copied, but no member changed
+            entry = {**entry, "fingerprint": fingerprint}
+        else:
+            with metrics.timer("index_build_seconds", source=normalized_path, stage="update"):
+                entry = _update_zip_index(entry, normalized_path, fingerprint)
+            query_cache.invalidate(normalized_path)
+        save_cached_index(normalized_path, fingerprint, _cacheable(entry))
+
+    entry = _with_dense(entry, normalized_path)
+
+    if old_store is not None and old_store is not entry["store"]:
+        old_store.delete()
+
+    loaded_indexes[normalized_path] = entry
+    return entry
+
+
+def _index_future(normalized_path: str, current: Callable[[], dict | None], load: Callable, *args) -> Future:
+    """
+    Return a future of the up-to-date index entry of a zip file or directory.
+
+    The entry returned by current() is used right away if there is one.
+    Otherwise load(*args) is scheduled on the index_loader pool, and callers
+    asking for the same source while it is loading share its future.
+    """
+    with _loading_lock:
+        future = _loading.get(normalized_path)
+        if future is not None:
+            return future
+
+        entry = current()
+        if entry is not None:
+            future = Future()
+            future.set_result(entry)
+            return future
+
+        future = index_loader.submit(load, *args)
+        _loading[normalized_path] = future
+
+    future.add_done_callback(partial(_finish_loading, normalized_path))
+    return future
+
+
+def _zip_index_future(zip_path: str) -> Future:
+    """Return a future of the up-to-date index entry of a zip file; loaded, unchanged zips are returned right away."""
     normalized_path = _normalize_path(zip_path)
+    return _index_future(
+        normalized_path, partial(_current_entry, normalized_path), _refresh_zip_index, normalized_path, zip_path
+    )
+
+
+def _finish_loading(normalized_path: str, future: Future) -> None:
+    with _loading_lock:
+        if _loading.get(normalized_path) is future:
+            del _loading[normalized_path]
+
+
+def _load_zip_index(zip_path: str) -> dict:
+    """
+    Load a zip file and create its search index if not already loaded, blocking until done.
+
+    Every lookup checks the zip's size and modification time. Tools running
+    on the event loop await _zip_index_future instead.
+    """
+    return _zip_index_future(zip_path).result()
+
+
+def preload_zips(paths: list[str]) -> list[Future]:
+    """
+    Start loading zip files in the background.
+
+    Args:
+        paths: Paths of the zip files to load
+
+    Returns:
+        The futures of the loads; failures are logged rather than raised
+    """
+    futures = [_zip_index_future(path) for path in paths]
+    for path, future in zip(paths, futures):
+        future.add_done_callback(partial(_log_preload, path))
+    return futures
+
+
+def _log_preload(zip_path: str, future: Future) -> None:
+    if future.exception() is not None:
+        logger.warning("Preloading %s failed: %s", zip_path, future.exception())
+    else:
+        logger.info("Preloaded %s (%d documents)", zip_path, future.result()["doc_count"])
+
+
+def _build_dir_index(dir_path: str, members: dict, fingerprint: dict) -> dict:
+    """Read the given files of a directory and create the search index and document store from scratch."""
+    docs = load_docs_from_dir(dir_path, members)
+    index, store = _index_chunks(dir_path, docs)
+    return {
+        "index": index,
+        "backend": SEARCH_BACKEND,
+        "doc_count": len(members),
+        "chunk_count": len(index.docs),
+        "fingerprint": fingerprint,
+        "members": members,
+        "stale_count": 0,
+        "store": store,
+        "source": "dir"
+    }
+
+
+def _refresh_dir_index(normalized_path: str, dir_path: str, include: list[str] | None,
+                       exclude: list[str] | None) -> dict:
+    """
+    Walk a directory and bring its search index up to date.
+
+    Files are compared by modification time and size, so only added or
+    edited files are read again. Include and exclude globs default to those
+    the directory was last loaded with. Runs in the index_loader pool; use
+    _dir_index_future to call it.
+    """
+    if not os.path.isdir(normalized_path):
+        loaded_indexes.pop(normalized_path, None)
+        raise FileNotFoundError(f"Directory not found: {dir_path}")
+
+    entry = loaded_indexes.get(normalized_path)
+    if entry is None:
+        with metrics.timer("index_build_seconds", source=normalized_path, stage="cache_load"):
+            entry = load_cached_index(normalized_path)
+    old_store = entry["store"] if entry is not None else None
+
+    previous = entry["fingerprint"] if entry is not None else {}
+    fingerprint = {
+        "path": normalized_path,
+        "include": list(previous.get("include", DEFAULT_INCLUDE) if include is None else include),
+        "exclude": list(previous.get("exclude", DEFAULT_EXCLUDE) if exclude is None else exclude)
+    }
+    members = scan_dir(normalized_path, fingerprint["include"], fingerprint["exclude"])
+
+    if entry is None or entry["backend"] != SEARCH_BACKEND or entry["fingerprint"] != fingerprint:
+        with metrics.timer("index_build_seconds", source=normalized_path, stage="build"):
+            entry = _build_dir_index(normalized_path, members, fingerprint)
+        save_cached_index(normalized_path, fingerprint, _cacheable(entry))
+        query_cache.invalidate(normalized_path)
+    elif entry["members"] != members:
+        with metrics.timer("index_build_seconds", source=normalized_path, stage="update"):
+            entry = _apply_changes(
+                entry, normalized_path, members,
+                load_changed=partial(load_docs_from_dir, normalized_path),
+                rebuild=partial(_build_dir_index, normalized_path, members, fingerprint)
+            )
+        save_cached_index(normalized_path, fingerprint, _cacheable(entry))
+        query_cache.invalidate(normalized_path)
+
+    entry = _with_dense(entry, normalized_path)
+
+    if old_store is not None and old_store is not entry["store"]:
+        old_store.delete()
+
+    loaded_indexes[normalized_path] = entry
+    return entry
+
+
+def _dir_index_future(dir_path: str, include: list[str] | None = None, exclude: list[str] | None = None,
+                      rescan: bool = True) -> Future:
+    """
+    Return a future of the index entry of a directory.
+
+    With rescan, the directory is walked again for changes; otherwise a
+    loaded entry is returned right away, as watched directories keep
+    themselves up to date.
+    """
+    normalized_path = _normalize_path(dir_path)
+    current = (lambda: None) if rescan else partial(loaded_indexes.get, normalized_path)
+    return _index_future(
+        normalized_path, current, _refresh_dir_index, normalized_path, dir_path, include, exclude
+    )
+
+
+def _watch_dir(normalized_path: str) -> None:
+    """Poll a loaded directory and apply file changes to its index until it is deleted or evicted."""
+    try:
+        while True:
+            time.sleep(DIR_WATCH_INTERVAL)
+            entry = loaded_indexes.peek(normalized_path)
+            if entry is None or not os.path.isdir(normalized_path):
+                break
 
-    if normalized_path not in loaded_indexes:
-        if not os.path.exists(normalized_path):
-            raise FileNotFoundError(f"Zip file not found: {zip_path}")
+            fingerprint = entry["fingerprint"]
+            try:
+                if scan_dir(normalized_path, fingerprint["include"], fingerprint["exclude"]) != entry["members"]:
+                    _dir_index_future(normalized_path).result()
+            except Exception as e:
+                logger.warning("Updating watched directory %s failed: %s", normalized_path, e)
+    finally:
+        with _loading_lock:
+            _watchers.pop(normalized_path, None)
 
-        docs = load_docs_from_zip(normalized_path)
-        index = create_index(docs)
-        loaded_indexes[normalized_path] = {
-            "index": index,
-            "doc_count": len(docs)
+
+def _start_watching(normalized_path: str) -> None:
+    """Start the watcher thread of a loaded directory, unless it is already watched."""
+    with _loading_lock:
+        if normalized_path in _watchers:
+            return
+        thread = threading.Thread(
+            target=_watch_dir, args=(normalized_path,), name=f"watch-{os.path.basename(normalized_path)}", daemon=True
+        )
+        _watchers[normalized_path] = thread
+    thread.start()
+
+
+def _page_index_key(index_name: str) -> str:
+    """Return the registry key of a page index, accepting names with or without the prefix."""
+    if index_name.startswith(PAGE_INDEX_PREFIX):
+        return index_name
+    return f"{PAGE_INDEX_PREFIX}{index_name}"
+
+
+def _load_page_index(index_name: str) -> dict | None:
+    """Return a page index from the registry, or from disk if it was persisted."""
+    key = _page_index_key(index_name)
+    entry = loaded_indexes.get(key)
+    if entry is None:
+        entry = load_cached_index(key)
+        if entry is not None:
+            loaded_indexes[key] = entry
+    return entry
+
+
+def _ingest_pages(index_name: str, pages: dict[str, str], persist: bool = False) -> dict:
+    """
+    Add fetched pages to a named page index, creating it if needed.
+
+    Pages are keyed by URL: a page whose content changed replaces its old
+    chunks, and an unchanged page is skipped. Page indexes always use the
+    built-in sparse engine, since minsearch cannot add terms to a fitted
+    vocabulary.
+
+    Args:
+        index_name: Name of the page index
+        pages: Mapping of URL to markdown content
+        persist: Save the page index to the on-disk index cache
+
+    Returns:
+        The updated registry entry
+    """
+    key = _page_index_key(index_name)
+    entry = _load_page_index(index_name)
+    if entry is None:
+        backend = "bm25" if SEARCH_BACKEND == "bm25" else "tfidf"
+        entry = {
+            "index": create_index([], backend=backend),
+            "backend": backend,
+            "doc_count": 0,
+            "chunk_count": 0,
+            "fingerprint": None,
+            "members": {},
+            "stale_count": 0,
+            "persist": persist
         }
 
-    return loaded_indexes[normalized_path]
+    hashes = {url: hashlib.sha256(content.encode('utf-8')).hexdigest() for url, content in pages.items()}
+    changed = [url for url, digest in hashes.items() if entry["members"].get(url) != digest]
+
+    index = entry["index"]
+    if changed:
+        index.remove(set(changed))
+        index.add(chunk_docs([{'filename': url, 'member': url, 'content': pages[url]} for url in changed]))
+        query_cache.invalidate(key)
+
+    members = {**entry["members"], **hashes}
+    entry = {
+        **entry,
+        "doc_count": len(members),
+        "chunk_count": len(index.docs),
+        "members": members,
+        "persist": entry["persist"] or persist
+    }
+
+    if entry["persist"] and (changed or persist):
+        save_cached_index(key, {"path": key}, entry)
+    loaded_indexes[key] = entry
+    return entry
+
+
+def _format_ingest_summary(index_name: str, info: dict) -> str:
+    key = _page_index_key(index_name)
+    storage = "persisted" if info["persist"] else "in memory"
+    return f"Indexed into {key} ({info['doc_count']} pages, {info['chunk_count']} chunks, {storage})"
+
+
+async def _resolve_index(source: str) -> tuple[str, dict]:
+    """
+    Return the registry key and entry of a page index name, directory or zip file path.
+
+    Names of existing page indexes take precedence; directories are loaded with load_dir's
+    defaults and anything else as a zip file, waiting on the load already in flight if there is one.
+    """
+    entry = _load_page_index(source)
+    if entry is not None:
+        return _page_index_key(source), entry
+
+    if os.path.isdir(source):
+        return _normalize_path(source), await asyncio.wrap_future(_dir_index_future(source, rescan=False))
+    return _normalize_path(source), await asyncio.wrap_future(_zip_index_future(source))
 
 
 @mcp.tool
-def load_zip(zip_path: str) -> str:
+@metrics.instrument
+async def load_zip(zip_path: str) -> str:
     """
     Load a zip file containing documentation for searching.
 
@@ -82,9 +744,8 @@ def load_zip(zip_path: str) -> str:
         A message indicating how many documents were loaded
     """
     try:
-        info = _load_zip_index(zip_path)
-        normalized_path = _normalize_path(zip_path)
-        return f"Loaded {info['doc_count']} documents from {normalized_path}"
+        normalized_path, info = _normalize_path(zip_path), await asyncio.wrap_future(_zip_index_future(zip_path))
+        return f"Loaded {info['doc_count']} documents ({info['chunk_count']} chunks) from {normalized_path}"
     except FileNotFoundError as e:
         return str(e)
     except Exception as e:
@@ -92,54 +753,437 @@ def load_zip(zip_path: str) -> str:
 
 
 @mcp.tool
+@metrics.instrument
+async def load_dir(dir_path: str, include: list[str] | None = None, exclude: list[str] | None = None,
+                   watch: bool = False) -> str:
+    """
+    Load a directory of markdown documentation for searching.
+
+    The directory is walked for files matching the include globs and none
+    of the exclude globs. Loading it again only re-reads files whose
+    modification time or size changed. Once loaded, search it with
+    search_docs by passing the directory path.
+
+    Args:
+        dir_path: Path to the directory to load
+        include: Globs of the files to index, relative to the directory (default: ["**/*.md", "**/*.mdx"])
+        exclude: Globs of files or directories to skip (default: hidden directories and node_modules)
+        watch: Keep watching the directory and apply file changes to the index as they happen
+
+    Returns:
+        A message indicating how many documents were loaded
+    """
+    try:
+        normalized_path = _normalize_path(dir_path)
+        info = await asyncio.wrap_future(_dir_index_future(dir_path, include, exclude))
+    except FileNotFoundError as e:
+        return str(e)
+    except Exception as e:
+        return f"Error loading directory: {e}"
+
+    if watch:
+        _start_watching(normalized_path)
+    return (
+        f"Loaded {info['doc_count']} documents ({info['chunk_count']} chunks) from {normalized_path}"
+        + (", watching for changes" if watch else "")
+    )
+
+
+@mcp.tool
+@metrics.instrument
 def list_loaded_zips() -> str:
     """
     List all currently loaded zip files.
 
+    Archives evicted to stay within the memory budget are not listed; they
+    are reloaded automatically the next time they are searched. Page indexes
+    are listed under their "pages:" name, directories are marked as such,
+    and archives still being loaded in the background are listed separately.
+
     Returns:
-        A list of loaded zip files with their document counts
+        A list of loaded zip files with their document counts and resident sizes
     """
-    if not loaded_indexes:
+    with _loading_lock:
+        loading = list(_loading)
+
+    if not loaded_indexes and not loading:
         return "No zip files are currently loaded. Use load_zip to load a documentation archive."
 
     lines = ["Loaded zip files:"]
     for path, info in loaded_indexes.items():
-        lines.append(f"  - {path} ({info['doc_count']} documents)")
+        if info.get("source") == "dir":
+            path = f"{path}/ (directory{', watched' if path in _watchers else ''})"
+        lines.append(
+            f"  - {path} ({info['doc_count']} documents, {info['chunk_count']} chunks, "
+            f"{info['resident_bytes'] / 2**20:.1f} MB)"
+        )
+    if loading:
+        lines.append("Loading:")
+        lines.extend(f"  - {path}" for path in loading)
+
+    budget = loaded_indexes.memory_budget
+    lines.append(
+        f"Resident: {loaded_indexes.resident_bytes() / 2**20:.1f} MB"
+        + (f" of {budget / 2**20:.1f} MB budget" if budget else "")
+        + f", {loaded_indexes.evictions} evictions"
+    )
     return "\n".join(lines)
 
 
 @mcp.tool
-def search_docs(query: str, zip_path: str) -> str:
+@metrics.instrument
+def clear_index_cache(zip_path: str = "") -> str:
+    """
+    Clear the on-disk search index cache.
+
+    The next load of an invalidated zip file rebuilds its index from scratch.
+    Persisted page indexes are stored in the same cache and are deleted too.
+
+    Args:
+        zip_path: Path to the zip file or "pages:" index to invalidate (default: clear the whole cache)
+
+    Returns:
+        A message indicating how many cached indexes were removed
+    """
+    if zip_path.startswith(PAGE_INDEX_PREFIX):
+        key = zip_path
+    else:
+        key = _normalize_path(zip_path) if zip_path else None
+    removed = invalidate_cache(key)
+    return f"Removed {removed} cached index(es)"
+
+
+def _with_snippets(results: list[dict], query: str, max_chars: int) -> list[dict]:
+    """Replace the content of results with the snippet that best matches the query."""
+    return [{**result, 'content': extract_snippet(result['content'], query, max_chars)} for result in results]
+
+
+def _format_results(results: list[dict]) -> str:
+    """Format search results as markdown sections, prefixed with their archive and score if present."""
+    output = []
+    for i, result in enumerate(results, 1):
+        title = result['filename']
+        if result.get('section'):
+            title = f"{title} ({result['section']})"
+        if '_archive' in result:
+            title = f"[{os.path.basename(result['_archive'])}] {title} (score {result['_score']:.3f})"
+        output.append(f"## {i}. {title}\n\n{result['content']}")
+
+    return "\n\n---\n\n".join(output)
+
+
+def _with_content(info: dict, results: list[dict]) -> list[dict]:
+    """Fill in the text of results from the index's document store; page indexes keep their content."""
+    if all('content' in result for result in results):
+        return results
+
+    contents = info["store"].get_many(result['doc_id'] for result in results)
+    return [{**result, 'content': content} for result, content in zip(results, contents)]
+
+
+def _format_expansions(expansions: dict[str, list[str]]) -> str:
+    """Describe how unknown query terms were expanded, so the caller does not retry with a corrected query."""
+    replaced = "; ".join(f"{term} -> {', '.join(matches)}" for term, matches in expansions.items())
+    return f"Expanded query terms: {replaced}"
+
+
+def _ranked(info: dict, query: str, expanded_query: str, num_results: int, output_scores: bool = False) -> list[dict]:
+    """Search an index by keywords, fused with dense results if it has a dense index."""
+    if info.get("dense") is None:
+        return search(info["index"], expanded_query, num_results=num_results, output_scores=output_scores)
+    return hybrid_search(info["index"], info["dense"], query, num_results=num_results,
+                         output_scores=output_scores, keyword_query=expanded_query)
+
+
+def _search_response(info: dict, query: str, num_results: int, max_chars: int) -> str:
+    """Search one index and format the results; runs in the search pool."""
+    expanded_query, expansions = expand_query(info["index"], query, FUZZY_EXPANSION)
+    results = _ranked(info, query, expanded_query, num_results)
+    if not results:
+        return f"No results found for '{query}'"
+
+    response = _format_results(_with_snippets(_with_content(info, results), expanded_query, max_chars))
+    if expansions:
+        response = f"{_format_expansions(expansions)}\n\n{response}"
+    return response
+
+
+@mcp.tool
+@metrics.instrument
+async def search_docs(query: str, zip_path: str, num_results: int = 5, max_chars: int = DEFAULT_SNIPPET_CHARS) -> str:
     """
-    Search documentation in a zip file for relevant information.
+    Search documentation in a zip file or page index for relevant information.
 
     The zip file will be automatically loaded if not already loaded.
+    Documents are split into sections by markdown heading, and the best
+    matching sections are returned rather than whole files. Each section is
+    cut to the passage that best matches the query. Pages added with
+    fetch_page or fetch_pages are searched by passing the index name, and
+    directories by passing their path.
 
     Args:
         query: The search query to find relevant documentation
-        zip_path: Path to the zip file to search
+        zip_path: Path to the zip file or directory to search, or the name of a page index
+        num_results: Number of sections to return (default: 5, at most 50)
+        max_chars: Maximum characters of content per section (default: 1000, 0 for the whole section)
 
     Returns:
-        The top 5 most relevant documentation sections with filenames and content
+        The most relevant documentation sections with filenames, heading paths and content snippets
     """
     try:
-        info = _load_zip_index(zip_path)
+        normalized_path, info = await _resolve_index(zip_path)
     except FileNotFoundError as e:
         return str(e)
     except Exception as e:
         return f"Error loading zip file: {e}"
 
-    results = search(info["index"], query, num_results=5)
+    num_results = max(1, min(num_results, MAX_RESULTS))
+    cached = query_cache.get(normalized_path, query, num_results, max_chars)
+    if cached is not None:
+        return cached
+
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    response = await loop.run_in_executor(search_pool, _search_response, info, query, num_results, max_chars)
+    _record_search(normalized_path, query, time.perf_counter() - start)
+
+    # Skip caching if the index was updated (e.g. by a directory watcher) while searching
+    if loaded_indexes.peek(normalized_path) is info:
+        query_cache.put(normalized_path, query, num_results, response, max_chars)
+    return response
+
+
+def _record_search(source: str, query: str, seconds: float) -> None:
+    """Record the duration of a search that was not answered from the query cache."""
+    metrics.observe("search_seconds", seconds, source=source)
+    metrics.record_slow("search", seconds, source=source, query=query)
+
+
+def _search_archive(zip_path: str, info: dict, query: str, num_results: int) -> tuple[list[dict], dict]:
+    """
+    Search one archive for search_all, expanding unknown terms against its own vocabulary.
+
+    Scores are divided by the archive's best score, so that TF-IDF, BM25
+    and fused hybrid indexes, and corpora of very different sizes, rank on
+    a common 0-1 scale.
+    """
+    start = time.perf_counter()
+    expanded_query, expansions = expand_query(info["index"], query, FUZZY_EXPANSION)
+    results = _ranked(info, query, expanded_query, num_results, output_scores=True)
+    _record_search(zip_path, query, time.perf_counter() - start)
+    if not results:
+        return [], expansions
+
+    top_score = results[0]['_score']
+    return [
+        {**result, '_archive': zip_path, '_raw_score': result['_score'], '_score': result['_score'] / top_score}
+        for result in results
+    ], expansions
+
+
+@mcp.tool
+@metrics.instrument
+async def search_all(query: str, num_results: int = 5, max_chars: int = DEFAULT_SNIPPET_CHARS) -> str:
+    """
+    Search every loaded zip file and page index at once.
+
+    Each archive is searched concurrently, scores are normalized per archive
+    and the overall best matches are returned, each labelled with the zip
+    file it came from.
+
+    Args:
+        query: The search query to find relevant documentation
+        num_results: Number of results to return across all archives (default: 5, at most 50)
+        max_chars: Maximum characters of content per section (default: 1000, 0 for the whole section)
+
+    Returns:
+        The most relevant documentation sections with archive names, filenames, heading paths and content snippets
+    """
+    if not loaded_indexes:
+        return "No zip files are currently loaded. Use load_zip to load a documentation archive."
+
+    num_results = max(1, min(num_results, MAX_RESULTS))
+
+    # Refresh archives that changed on disk before fanning out, skipping deleted ones
+    paths = [path for path, _ in loaded_indexes.items()]
+    entries = {}
+    for path, resolved in zip(paths, await asyncio.gather(*map(_resolve_index, paths), return_exceptions=True)):
+        if isinstance(resolved, FileNotFoundError):
+            continue
+        if isinstance(resolved, BaseException):
+            raise resolved
+        entries[path] = resolved[1]
+
+    loop = asyncio.get_running_loop()
+    searches = [
+        loop.run_in_executor(search_pool, _search_archive, path, info, query, num_results)
+        for path, info in entries.items()
+    ]
+    results = []
+    expansions = {}
+    for archive_results, archive_expansions in await asyncio.gather(*searches):
+        results.extend(archive_results)
+        for term, matches in archive_expansions.items():
+            expansions.setdefault(term, [])
+            expansions[term].extend(match for match in matches if match not in expansions[term])
+
+    # Ties on the normalized score are broken by the raw score
+    results.sort(key=lambda result: (result['_score'], result['_raw_score']), reverse=True)
+    results = results[:num_results]
 
     if not results:
         return f"No results found for '{query}'"
 
-    output = []
-    for i, result in enumerate(results, 1):
-        output.append(f"## {i}. {result['filename']}\n\n{result['content']}")
+    # Read back the text of hits from each index's document store, keeping the global order
+    for path in {result['_archive'] for result in results}:
+        positions = [i for i, result in enumerate(results) if result['_archive'] == path]
+        for i, result in zip(positions, _with_content(entries[path], [results[i] for i in positions])):
+            results[i] = result
+
+    # Snippets look for the original terms and everything they were expanded to
+    snippet_query = " ".join([query, *(match for matches in expansions.values() for match in matches)])
+    response = _format_results(_with_snippets(results, snippet_query, max_chars))
+    if expansions:
+        response = f"{_format_expansions(expansions)}\n\n{response}"
+    return response
 
-    return "\n\n---\n\n".join(output)
 
+@mcp.tool
+@metrics.instrument
+def query_cache_stats() -> str:
+    """
+    Show hit and miss counters of the search_docs result cache.
+
+    Returns:
+        Cache size, hits, misses, hit rate and invalidations
+    """
+    stats = query_cache.stats()
+    return (
+        f"Query cache: {stats['size']}/{stats['maxsize']} entries, "
+        f"{stats['hits']} hits, {stats['misses']} misses "
+        f"({stats['hit_rate']:.1%} hit rate), {stats['invalidations']} invalidated"
+    )
+
+
+
+def _collect_gauges(metrics: Metrics) -> None:
+    """Refresh the gauges of loaded indexes and caches before a metrics snapshot."""
+    metrics.clear_gauges("index_resident_bytes")
+    metrics.clear_gauges("index_chunks")
+    for path, info in loaded_indexes.items():
+        metrics.set_gauge("index_resident_bytes", info["resident_bytes"], source=path)
+        metrics.set_gauge("index_chunks", info["chunk_count"], source=path)
+    metrics.set_gauge("registry_resident_bytes", loaded_indexes.resident_bytes())
+    metrics.set_gauge("registry_evictions", loaded_indexes.evictions)
+
+    stats = query_cache.stats()
+    for name in ("size", "hits", "misses", "invalidations"):
+        metrics.set_gauge(f"query_cache_{name}", stats[name])
+    metrics.set_gauge("query_cache_hit_ratio", stats["hit_rate"])
+
+    for result in ("hits", "revalidations", "downloads"):
+        metrics.set_gauge("page_cache_requests", getattr(page_fetcher, result), result=result)
+
+
+metrics.add_collector(_collect_gauges)
+
+
+def _format_seconds(seconds: float) -> str:
+    return f"{seconds * 1000:.1f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+
+def _histogram_lines(snapshot: dict, name: str, describe: Callable[[dict], str]) -> list[str]:
+    """Format the histograms of one metric as one line each, slowest first, labelled by describe(metric)."""
+    histograms = sorted(
+        (metric for metric in snapshot["histograms"] if metric["name"] == name),
+        key=lambda metric: metric["max"], reverse=True
+    )
+    return [
+        f"  - {describe(metric)}: {metric['count']} x, p50 {_format_seconds(metric['p50'])}, "
+        f"p95 {_format_seconds(metric['p95'])}, max {_format_seconds(metric['max'])}"
+        for metric in histograms
+    ]
+
+
+def _format_stats(snapshot: dict) -> str:
+    """Format a metrics snapshot as a readable report."""
+    output_kb = {
+        metric["labels"]["tool"]: metric["sum"] / metric["count"] / 1024
+        for metric in snapshot["histograms"] if metric["name"] == "tool_output_bytes"
+    }
+    errors = {
+        metric["labels"]["tool"]: int(metric["value"])
+        for metric in snapshot["counters"] if metric["name"] == "tool_errors_total"
+    }
+
+    def describe_tool(metric: dict) -> str:
+        tool = metric["labels"]["tool"]
+        details = [f"avg output {output_kb[tool]:.1f} KB"] if tool in output_kb else []
+        details += [f"{errors[tool]} errors"] if tool in errors else []
+        return f"{tool} ({', '.join(details)})" if details else tool
+
+    lines = []
+    for title, name, describe in (
+        ("Tool calls:", "tool_duration_seconds", describe_tool),
+        ("Searches by source (uncached):", "search_seconds", lambda metric: metric["labels"]["source"]),
+        ("Index builds:", "index_build_seconds",
+         lambda metric: f"{metric['labels']['source']} ({metric['labels']['stage']})"),
+        ("Page fetches:", "fetch_seconds", lambda metric: metric["labels"]["result"]),
+    ):
+        section = _histogram_lines(snapshot, name, describe)
+        if section:
+            lines.extend([title, *section])
+
+    lines.append("Indexes:")
+    lines.extend(
+        f"  - {path}: {info['chunk_count']} chunks, {info['resident_bytes'] / 2**20:.1f} MB"
+        for path, info in loaded_indexes.items()
+    )
+    lines.append(
+        f"  Resident: {loaded_indexes.resident_bytes() / 2**20:.1f} MB, {loaded_indexes.evictions} evictions"
+    )
+
+    stats = query_cache.stats()
+    lines.append(
+        f"Query cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%} hit rate)"
+    )
+    lines.append(
+        f"Page cache: {page_fetcher.hits} hits, {page_fetcher.revalidations} revalidations, "
+        f"{page_fetcher.downloads} downloads"
+    )
+
+    slowest = snapshot["slowest"].get("search", [])
+    if slowest:
+        lines.append("Slowest searches:")
+        lines.extend(
+            f"  - {_format_seconds(item['seconds'])}: '{item['query']}' in {item['source']}" for item in slowest
+        )
+    return "\n".join(lines)
+
+
+@mcp.tool
+@metrics.instrument
+def server_stats(format: str = "text") -> str:
+    """
+    Show latency, size and cache metrics of the server.
+
+    Reports per-tool latency percentiles and output sizes, search and index
+    build timings per archive, page fetch timings, cache hit rates, resident
+    index sizes and the slowest searches since the server started.
+
+    Args:
+        format: "text" for a readable report, "prometheus" for the Prometheus text format
+                or "json" for the raw snapshot (default: "text")
+
+    Returns:
+        The metrics in the requested format
+    """
+    snapshot = metrics.snapshot()
+    if format == "prometheus":
+        return metrics.to_prometheus(snapshot)
+    if format == "json":
+        return metrics.to_json_line(snapshot)
+    return _format_stats(snapshot)
 
 if __name__ == "__main__":
     mcp.run()
@@ -0,0 +1,334 @@
+"""In-process metrics of the server: latency histograms, counters and gauges, with Prometheus and JSON lines export."""
+
+import asyncio
+import heapq
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Upper bounds of the size buckets, in bytes (256 B to 4 MB)
+SIZE_BUCKETS = tuple(float(256 * 4 ** i) for i in range(8))
+
+# Metric names are exported with this prefix
+PREFIX = "mcp_"
+
+
+class Histogram:
+    """
+    Distribution of observed values in fixed buckets, with their count, sum and maximum.
+
+    Quantiles are estimated as the upper bound of the bucket they fall in,
+    capped by the largest value observed.
+
+    Attributes:
+        buckets (tuple): Upper bounds of the buckets, ascending; larger values go to an overflow bucket.
+        counts (list): Number of values in each bucket, overflow bucket last.
+        count (int): Number of values observed.
+        sum (float): Sum of the values observed.
+        max (float): Largest value observed.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Return an estimate of the q-quantile (0 when nothing was observed)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    """Format labels as a Prometheus label set, escaping values."""
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escaped = (
+        f'{name}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    """
+    Thread-safe registry of histograms, counters and gauges, keyed by name and labels.
+
+    Histograms and counters accumulate for the lifetime of the process.
+    Gauges hold the last value set, and are usually refreshed by a collector
+    function right before a snapshot is taken. The slowest operations
+    recorded with record_slow are kept, with their details, to find slow
+    archives and queries.
+
+    Attributes:
+        slow_log_size (int): Number of slowest operations kept per kind.
+    """
+
+    def __init__(self, slow_log_size: int = 10):
+        self.slow_log_size = slow_log_size
+        self._histograms: dict[tuple, Histogram] = {}
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+        self._slowest: dict[str, list] = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, buckets: tuple = LATENCY_BUCKETS, **labels) -> None:
+        """Add a value to the histogram of a metric."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """Add to a counter."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to its current value."""
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def clear_gauges(self, name: str) -> None:
+        """Remove every labelled value of a gauge, e.g. before setting those of the indexes still loaded."""
+        with self._lock:
+            for key in [key for key in self._gauges if key[0] == name]:
+                del self._gauges[key]
+
+    def add_collector(self, collector) -> None:
+        """Register a function called before every snapshot to refresh gauges."""
+        self._collectors.append(collector)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the duration of the block, in seconds, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def record_slow(self, kind: str, seconds: float, **details) -> None:
+        """Keep an operation among the slowest of its kind if it is slow enough."""
+        item = (seconds, time.time(), details)
+        with self._lock:
+            slowest = self._slowest.setdefault(kind, [])
+            if len(slowest) < self.slow_log_size:
+                heapq.heappush(slowest, item)
+            elif seconds > slowest[0][0]:
+                heapq.heapreplace(slowest, item)
+
+    def instrument(self, func):
+        """
+        Decorate a tool function to record its latency and output size, labelled with its name.
+
+        Works with sync and async functions. Tools that raise are counted in
+        tool_errors_total; their latency is still recorded.
+        """
+        tool_name = func.__name__
+
+        def record(start: float, result) -> None:
+            self.observe("tool_duration_seconds", time.perf_counter() - start, tool=tool_name)
+            if isinstance(result, str):
+                self.observe("tool_output_bytes", len(result.encode("utf-8")), buckets=SIZE_BUCKETS, tool=tool_name)
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException:
+                    self.increment("tool_errors_total", tool=tool_name)
+                    record(start, None)
+                    raise
+                record(start, result)
+                return result
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException:
+                    self.increment("tool_errors_total", tool=tool_name)
+                    record(start, None)
+                    raise
+                record(start, result)
+                return result
+
+        return wrapper
+
+    def snapshot(self) -> dict:
+        """
+        Return every metric as plain data.
+
+        Returns:
+            {"histograms": [...], "counters": [...], "gauges": [...], "slowest": {kind: [...]}}, where
+            each metric has its "name" and "labels" next to its value or histogram snapshot
+        """
+        for collector in self._collectors:
+            collector(self)
+
+        with self._lock:
+            return {
+                "histograms": [
+                    {"name": name, "labels": dict(labels), **histogram.snapshot()}
+                    for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0])
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "gauges": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._gauges.items())
+                ],
+                "slowest": {
+                    kind: [
+                        {"seconds": seconds, "at": at, **details}
+                        for seconds, at, details in sorted(items, key=lambda item: item[0], reverse=True)
+                    ]
+                    for kind, items in self._slowest.items()
+                },
+            }
+
+    def to_prometheus(self, snapshot: dict | None = None) -> str:
+        """Format a snapshot in the Prometheus text exposition format."""
+        snapshot = snapshot or self.snapshot()
+        lines = []
+        typed = set()
+
+        def type_line(name: str, kind: str) -> None:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        for metric in snapshot["histograms"]:
+            name, labels = metric["name"], _label_key(metric["labels"])
+            type_line(name, "histogram")
+            cumulative = 0
+            for bound, count in metric["buckets"].items():
+                cumulative += count
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {metric['sum']}")
+            lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {metric['count']}")
+
+        for kind, metrics in (("counter", snapshot["counters"]), ("gauge", snapshot["gauges"])):
+            for metric in metrics:
+                type_line(metric["name"], kind)
+                lines.append(f"{PREFIX}{metric['name']}{_format_labels(_label_key(metric['labels']))} {metric['value']}")
+
+        return "\n".join(lines) + "\n"
+
+    def to_json_line(self, snapshot: dict | None = None) -> str:
+        """Format a snapshot as one line of JSON, stamped with the current time."""
+        return json.dumps({"time": time.time(), **(snapshot or self.snapshot())}, separators=(",", ":"))
+
+    def write(self, path: str, fmt: str = "prometheus") -> None:
+        """
+        Export the metrics to a file.
+
+        Prometheus text replaces the file atomically, so a textfile collector
+        never reads it half written; JSON lines are appended.
+
+        Args:
+            path: File to write
+            fmt: 'prometheus' or 'jsonl'
+        """
+        if fmt == "jsonl":
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(self.to_json_line() + "\n")
+            return
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+class MetricsExporter:
+    """
+    Background thread writing the metrics to a file every interval seconds.
+
+    Attributes:
+        path (str): File the metrics are written to.
+        fmt (str): 'prometheus' or 'jsonl'.
+        interval (float): Seconds between two writes.
+    """
+
+    def __init__(self, metrics: Metrics, path: str, fmt: str = "prometheus", interval: float = 15.0):
+        if fmt not in ("prometheus", "jsonl"):
+            raise ValueError(f"Unknown metrics format: {fmt} (expected 'prometheus' or 'jsonl')")
+        self.metrics = metrics
+        self.path = path
+        self.fmt = fmt
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self) -> None:
+        try:
+            self.metrics.write(self.path, self.fmt)
+        except OSError:
+            # Exporting is best effort; the next interval tries again
+            pass
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread and write the final values."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
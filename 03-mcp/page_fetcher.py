@@ -0,0 +1,207 @@
+"""Async fetching of web pages through Jina Reader, with a pooled client and an on-disk cache."""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+import httpx
+
+from metrics import Metrics
+
+DEFAULT_READER_URL = "https://r.jina.ai/"
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".page_cache")
+
+
+class PageCache:
+    """
+    On-disk cache of fetched pages, one JSON file per URL.
+
+    Entries younger than the TTL are served without a request. Older entries
+    keep their ETag and Last-Modified validators, so they can be revalidated
+    with a conditional request instead of being downloaded again.
+
+    Attributes:
+        cache_dir (str): Directory holding the cache files.
+        ttl (float): Number of seconds an entry is served without revalidation.
+    """
+
+    def __init__(self, cache_dir: str, ttl: float = 3600):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def _cache_file(self, url: str) -> str:
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def get(self, url: str) -> dict | None:
+        """Return the cached entry of a URL, fresh or not, or None if there is none."""
+        try:
+            with open(self._cache_file(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except Exception:
+            # Missing, corrupt or unreadable cache files are treated as a miss
+            return None
+
+        return entry if entry.get("url") == url else None
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def put(self, url: str, entry: dict) -> bool:
+        """Write an entry through a temporary file, returning False if the write failed."""
+        cache_file = self._cache_file(url)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({**entry, "url": url}, f)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            return False
+
+        return True
+
+    def clear(self) -> int:
+        """Remove every cached page and return how many were removed."""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.cache_dir, name))
+                removed += 1
+        return removed
+
+
+class PageFetcher:
+    """
+    Fetch web pages as markdown through a shared, pooled async HTTP client.
+
+    The client is created on first use and reused for every request, so
+    connections to the reader are kept alive between calls.
+
+    Attributes:
+        reader_url (str): Prefix prepended to every URL (Jina Reader by default).
+        timeout (httpx.Timeout): Connect, read, write and pool timeouts.
+        limits (httpx.Limits): Connection pool limits.
+        cache (PageCache | None): On-disk response cache, or None to disable caching.
+        metrics (Metrics | None): Registry recording the duration of each request in
+                                  fetch_seconds, labelled with its result.
+        hits (int): Number of pages served from the cache without a request.
+        revalidations (int): Number of stale pages confirmed unchanged with a 304 response.
+        downloads (int): Number of pages downloaded in full.
+    """
+
+    def __init__(self, reader_url: str = DEFAULT_READER_URL, timeout: float = 30.0,
+                 max_connections: int = 10, cache: PageCache | None = None, metrics: Metrics | None = None):
+        self.reader_url = reader_url
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, 10.0))
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.cache = cache
+        self.metrics = metrics
+        self.hits = 0
+        self.revalidations = 0
+        self.downloads = 0
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating a new one if the event loop changed."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # A client's connections belong to the loop that opened them
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, follow_redirects=True)
+            self._client_loop = loop
+        return self._client
+
+    async def fetch(self, url: str) -> str:
+        """
+        Fetch the content of a web page as markdown.
+
+        Args:
+            url: The URL of the web page to fetch (e.g., https://example.com)
+
+        Returns:
+            The page content in markdown format
+
+        Raises:
+            httpx.HTTPError: If the request fails or the reader returns an error status
+        """
+        entry = self.cache.get(url) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry):
+            self.hits += 1
+            return entry["content"]
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        start = time.perf_counter()
+        try:
+            response = await self._get_client().get(f"{self.reader_url}{url}", headers=headers)
+            if response.status_code != 304 or entry is None:
+                response.raise_for_status()
+        except httpx.HTTPError:
+            self._observe(start, "error")
+            raise
+
+        if response.status_code == 304 and entry is not None:
+            self._observe(start, "revalidated")
+            self.revalidations += 1
+            entry = {**entry, "fetched_at": time.time()}
+        else:
+            self._observe(start, "downloaded")
+            self.downloads += 1
+            entry = {
+                "content": response.text,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+            }
+
+        if self.cache is not None:
+            self.cache.put(url, entry)
+        return entry["content"]
+
+    def _observe(self, start: float, result: str) -> None:
+        if self.metrics is not None:
+            self.metrics.observe("fetch_seconds", time.perf_counter() - start, result=result)
+
+    async def fetch_many(self, urls: list[str], max_concurrency: int = 5) -> dict[str, str | Exception]:
+        """
+        Fetch several pages concurrently, with at most max_concurrency requests in flight.
+
+        Args:
+            urls: URLs to fetch; duplicates are fetched once
+            max_concurrency: Maximum number of concurrent requests
+
+        Returns:
+            Mapping of URL to page content, or to the exception raised while fetching it,
+            in the order of urls
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def fetch_one(url: str) -> str:
+            async with semaphore:
+                return await self.fetch(url)
+
+        unique_urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(fetch_one(url) for url in unique_urls), return_exceptions=True)
+        return dict(zip(unique_urls, results))
+
+    async def aclose(self) -> None:
+        """Close the shared client and its connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
@@ -0,0 +1,90 @@
+"""Bounded LRU cache of formatted search_docs responses."""
+
+import threading
+from collections import OrderedDict
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so trivially different spellings share a cache entry.
+
+    Only whitespace is collapsed: case matters, because tokenize splits
+    camelCase identifiers ('getUser' and 'getuser' are different queries).
+    """
+    return " ".join(query.split())
+
+
+class QueryCache:
+    """
+    LRU cache of search responses keyed on zip path, normalized query, number of results and snippet length.
+
+    Attributes:
+        maxsize (int): Maximum number of cached responses.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that were not cached.
+        invalidations (int): Number of entries dropped because their zip's index changed.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, zip_path: str, query: str, num_results: int, max_chars: int) -> tuple:
+        return (zip_path, normalize_query(query), num_results, max_chars)
+
+    def get(self, zip_path: str, query: str, num_results: int, max_chars: int = 0) -> str | None:
+        """Return the cached response, or None on a miss."""
+        key = self._key(zip_path, query, num_results, max_chars)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, zip_path: str, query: str, num_results: int, response: str, max_chars: int = 0) -> None:
+        """Cache a response, evicting the least recently used entry if the cache is full."""
+        if self.maxsize <= 0:
+            return
+
+        key = self._key(zip_path, query, num_results, max_chars)
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, zip_path: str) -> int:
+        """
+        Drop every cached response of a zip file.
+
+        Args:
+            zip_path: Normalized path of the zip file whose index changed
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == zip_path]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def stats(self) -> dict:
+        """Return the cache size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,84 @@
+"""Memory-bounded registry of loaded search indexes with LRU eviction."""
+
+import threading
+from collections import OrderedDict
+
+
+class IndexRegistry:
+    """
+    Registry of loaded zip indexes that stays within a memory budget.
+
+    Every entry's resident size is measured when it is stored. Once the total
+    exceeds the budget, the least recently used entries are evicted; they are
+    simply rebuilt (or reloaded from the on-disk cache) the next time they
+    are looked up. All methods are thread-safe, so indexes can be loaded in
+    background threads while tools read the registry.
+
+    Attributes:
+        memory_budget (int): Maximum total resident size in bytes (0 for no limit).
+        evictions (int): Number of entries evicted so far.
+    """
+
+    def __init__(self, memory_budget: int = 0):
+        self.memory_budget = memory_budget
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, zip_path: str) -> dict | None:
+        """Return the entry of a zip file and mark it as most recently used."""
+        with self._lock:
+            entry = self._entries.get(zip_path)
+            if entry is not None:
+                self._entries.move_to_end(zip_path)
+            return entry
+
+    def peek(self, zip_path: str) -> dict | None:
+        """Return the entry of a zip file without marking it as used."""
+        with self._lock:
+            return self._entries.get(zip_path)
+
+    def __setitem__(self, zip_path: str, entry: dict) -> None:
+        entry["resident_bytes"] = entry["index"].memory_usage()
+        if entry.get("dense") is not None:
+            entry["resident_bytes"] += entry["dense"].nbytes()
+        with self._lock:
+            self._entries[zip_path] = entry
+            self._entries.move_to_end(zip_path)
+            self._evict(keep=zip_path)
+
+    def _evict(self, keep: str) -> None:
+        """Evict least recently used entries, other than keep, until the budget is met."""
+        if not self.memory_budget:
+            return
+
+        for zip_path in list(self._entries):
+            if self.resident_bytes() <= self.memory_budget:
+                break
+            if zip_path != keep:
+                del self._entries[zip_path]
+                self.evictions += 1
+
+    def pop(self, zip_path: str, default=None):
+        with self._lock:
+            return self._entries.pop(zip_path, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def items(self) -> list[tuple[str, dict]]:
+        """Return a snapshot of the (zip path, entry) pairs, least recently used first."""
+        with self._lock:
+            return list(self._entries.items())
+
+    def __contains__(self, zip_path: str) -> bool:
+        return zip_path in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def resident_bytes(self) -> int:
+        """Return the total resident size of all entries, in bytes."""
+        with self._lock:
+            return sum(entry["resident_bytes"] for entry in self._entries.values())
@@ -1,78 +1,1123 @@
-"""Search implementation using minsearch for fastmcp documentation."""
+"""Search implementation for fastmcp documentation, with pluggable search backends."""
 
+import os
+import re
+import sys
 import zipfile
+from collections import Counter
+from collections.abc import Collection, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from itertools import islice
+from typing import Protocol
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
 from minsearch import Index
 
+from doc_store import DocumentStoreWriter
+
+# Default chunk size cap and overlap, in characters
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_CHUNK_OVERLAP = 200
+
+# Default number of chunks fitted per batch by create_index_streaming
+DEFAULT_BATCH_SIZE = 1000
+
+HEADING_RE = re.compile(r'^(#{1,6})[ \t]+(.+?)(?:[ \t]+#+)?[ \t]*$')
+FENCE_RE = re.compile(r'^[ \t]*(```|~~~)')
+
+# Same token pattern as minsearch's default TfidfVectorizer
+TOKEN_RE = re.compile(r'(?u)\b\w\w+\b')
+
+# Words of two or more characters, and dotted identifiers such as FastMCP.add_tool
+WORD_RE = re.compile(r'\w\w+(?:\.\w+)*')
+
+# Parts of a camelCase or PascalCase identifier: get/User/ID, HTTP/Server, Fast/MCP
+CAMEL_RE = re.compile(r'[A-Z]{2,}(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+')
+
+# MDX and JSX that carries no searchable text: ESM import/export lines, comments
+# and component or HTML tags (a tag's quoted attribute values are kept). Each
+# pattern starts with a literal so the scan skips ahead quickly; generics such
+# as List<str> are not opening tags, because the '<' follows a word character.
+ESM_RE = re.compile(
+    r'^(?:import\s[^\n]*?\bfrom\s*[\'"][^\'"\n]+[\'"]|import\s*[\'"][^\'"\n]+[\'"]'
+    r'|export\s+(?:const|let|default|function)\b)[^\n]*$',
+    re.MULTILINE
+)
+MDX_COMMENT_RE = re.compile(r'<!--.*?-->|\{/\*.*?\*/\}', re.DOTALL)
+TAG_RE = re.compile(r'<(?:/[A-Za-z][\w.:-]*\s*>|(?<!\w<)[A-Za-z][\w.:-]*(?:\s+[^<>]*?)?/?>)')
+ATTRIBUTE_VALUE_RE = re.compile(r'"([^"]*)"|\'([^\']*)\'')
+
+INLINE_CODE_RE = re.compile(r'`([^`\n]+)`')
+IDENTIFIER_RE = re.compile(r'[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*(?P<call>\()?')
+
+# Text fields indexed for each chunk, with the boost applied to each field's score
+FIELD_BOOSTS = {'content': 1.0, 'section': 2.0, 'symbols': 1.5}
+
+# Fields only needed to score documents, dropped from stored documents once vectorized
+INDEX_ONLY_FIELDS = frozenset({'symbols'})
+
+# Files of a directory source that are indexed, as globs relative to the directory
+DEFAULT_INCLUDE = ('**/*.md', '**/*.mdx')
+DEFAULT_EXCLUDE = ('**/.*/**', '**/node_modules/**')
+
+
+def is_doc_member(file_info: zipfile.ZipInfo) -> bool:
+    """Return True if a zip member is a markdown or mdx file."""
+    # Skip directories
+    if file_info.is_dir():
+        return False
+
+    # Only process .md and .mdx files
+    return file_info.filename.endswith('.md') or file_info.filename.endswith('.mdx')
+
+
+def member_filename(member: str) -> str:
+    """Remove the first part of a member path (e.g., "fastmcp-main/")."""
+    if '/' in member:
+        return '/'.join(member.split('/')[1:])
+    return member
+
 
-def load_docs_from_zip(zip_path: str) -> list[dict]:
+def zip_member_crcs(zip_path: str) -> dict[str, int]:
+    """
+    Read the CRC-32 of every markdown and mdx member from the central directory.
+
+    Args:
+        zip_path: Path to the zip file
+
+    Returns:
+        Dictionary mapping member names to their CRC-32 values
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        return {
+            file_info.filename: file_info.CRC
+            for file_info in zf.infolist()
+            if is_doc_member(file_info)
+        }
+
+
+def _doc_member_names(zf: zipfile.ZipFile, members: list[str] | None = None) -> list[str]:
+    """List markdown and mdx member names in archive order, optionally restricted to members."""
+    wanted = set(members) if members is not None else None
+    return [
+        file_info.filename
+        for file_info in zf.infolist()
+        if is_doc_member(file_info) and (wanted is None or file_info.filename in wanted)
+    ]
+
+
+def zip_docs_size(zip_path: str) -> int:
+    """Return the total uncompressed size of the markdown and mdx members, in bytes."""
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        return sum(file_info.file_size for file_info in zf.infolist() if is_doc_member(file_info))
+
+
+def iter_docs_from_zip(zip_path: str, members: list[str] | None = None) -> Iterator[dict]:
+    """
+    Yield markdown and mdx files from a zip archive one at a time.
+
+    Only one decoded document is held in memory at a time, so arbitrarily
+    large archives can be streamed into an index (see create_index_streaming).
+
+    Args:
+        zip_path: Path to the zip file
+        members: Optional list of member names to load (default: all markdown and mdx files)
+
+    Yields:
+        Documents with 'filename', 'member' and 'content' fields, in archive order
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        for member in _doc_member_names(zf, members):
+            yield {
+                'filename': member_filename(member),
+                'member': member,
+                'content': zf.read(member).decode('utf-8')
+            }
+
+
+def _read_members(zip_path: str, members: list[str]) -> list[dict]:
+    """Read and decode zip members through a separate ZipFile handle."""
+    return list(iter_docs_from_zip(zip_path, members))
+
+
+def load_docs_from_zip(zip_path: str, members: list[str] | None = None,
+                       workers: int = 1, executor: str = 'thread') -> list[dict]:
     """
     Load markdown and mdx files from a zip archive.
 
+    With workers > 1 the member list is split into contiguous slices that are
+    decompressed and decoded in parallel, each worker through its own
+    ZipFile handle. Documents are always returned in archive order.
+
     Args:
         zip_path: Path to the zip file
+        members: Optional list of member names to load (default: all markdown and mdx files)
+        workers: Number of parallel workers (default: 1, no parallelism)
+        executor: 'thread' or 'process' pool, used when workers > 1
 
     Returns:
-        List of documents with 'filename' and 'content' fields
+        List of documents with 'filename', 'member' and 'content' fields
     """
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        names = _doc_member_names(zf, members)
+
+    if workers <= 1 or len(names) < 2:
+        return _read_members(zip_path, names)
+
+    if executor == 'thread':
+        pool_class = ThreadPoolExecutor
+    elif executor == 'process':
+        pool_class = ProcessPoolExecutor
+    else:
+        raise ValueError(f"Unknown executor: {executor!r} (expected 'thread' or 'process')")
+
+    # A few slices per worker keeps the pool busy when member sizes are uneven
+    num_slices = min(len(names), workers * 4)
+    bounds = [len(names) * i // num_slices for i in range(num_slices + 1)]
+    slices = [names[bounds[i]:bounds[i + 1]] for i in range(num_slices)]
+
     docs = []
+    with pool_class(max_workers=workers) as pool:
+        # map() yields results in submission order, so the output is deterministic
+        for slice_docs in pool.map(_read_members, [zip_path] * len(slices), slices):
+            docs.extend(slice_docs)
 
-    with zipfile.ZipFile(zip_path, 'r') as zf:
-        for file_info in zf.infolist():
-            # Skip directories
-            if file_info.is_dir():
-                continue
+    return docs
 
-            # Only process .md and .mdx files
-            if not (file_info.filename.endswith('.md') or file_info.filename.endswith('.mdx')):
-                continue
 
-            # Remove the first part of the path (e.g., "fastmcp-main/")
-            filename = file_info.filename
-            if '/' in filename:
-                filename = '/'.join(filename.split('/')[1:])
+def _glob_regex(patterns: Iterable[str]) -> re.Pattern:
+    """
+    Compile globs matched against relative '/'-separated paths into one regex.
 
-            # Read the content
-            content = zf.read(file_info).decode('utf-8')
+    '**' matches any number of directories (including none), '*' and '?'
+    match within one path component.
+    """
+    translated = []
+    for pattern in patterns:
+        parts = re.split(r'(\*\*/|\*\*|\*|\?)', pattern)
+        tokens = {'**/': '(?:.*/)?', '**': '.*', '*': '[^/]*', '?': '[^/]'}
+        translated.append(''.join(tokens.get(part, re.escape(part)) for part in parts))
+    return re.compile('|'.join(f'(?:{regex})' for regex in translated) or '(?!)')
+
+
+def scan_dir(root: str, include: Iterable[str] = DEFAULT_INCLUDE,
+             exclude: Iterable[str] = DEFAULT_EXCLUDE) -> dict[str, tuple[int, int]]:
+    """
+    Find the files of a directory tree matching the include globs and none of the exclude globs.
+
+    Only file metadata is read. Directories matched by an exclude glob, such
+    as '**/node_modules/**', are not descended into.
 
-            docs.append({
-                'filename': filename,
-                'content': content
-            })
+    Args:
+        root: Directory to scan
+        include: Globs of files to index, relative to root (e.g. 'docs/**/*.md')
+        exclude: Globs of files or directories to skip
+
+    Returns:
+        Dictionary mapping relative paths ('/'-separated) to their (mtime_ns, size),
+        sorted by path
+    """
+    include_re = _glob_regex(include)
+    exclude_re = _glob_regex(exclude)
+    files = {}
 
+    for dir_path, dir_names, file_names in os.walk(root):
+        rel_dir = os.path.relpath(dir_path, root).replace(os.sep, '/')
+        prefix = '' if rel_dir == '.' else f"{rel_dir}/"
+        dir_names[:] = [name for name in dir_names if not exclude_re.fullmatch(f"{prefix}{name}/")]
+
+        for name in file_names:
+            rel_path = f"{prefix}{name}"
+            if include_re.fullmatch(rel_path) and not exclude_re.fullmatch(rel_path):
+                try:
+                    stat = os.stat(os.path.join(dir_path, name))
+                except FileNotFoundError:
+                    continue
+                files[rel_path] = (stat.st_mtime_ns, stat.st_size)
+
+    return dict(sorted(files.items()))
+
+
+def load_docs_from_dir(root: str, paths: Iterable[str]) -> list[dict]:
+    """
+    Read files of a directory source.
+
+    Files that disappeared since they were scanned are skipped.
+
+    Args:
+        root: Directory the paths are relative to
+        paths: Relative, '/'-separated paths (see scan_dir)
+
+    Returns:
+        Documents with 'filename', 'member' (both the relative path) and 'content' fields
+    """
+    docs = []
+    for path in paths:
+        try:
+            with open(os.path.join(root, *path.split('/')), 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+        except FileNotFoundError:
+            continue
+        docs.append({'filename': path, 'member': path, 'content': content})
     return docs
 
 
-def create_index(docs: list[dict]) -> Index:
+def _split_sections(content: str) -> list[tuple[str, list[str]]]:
+    """
+    Split markdown into sections at ATX headings.
+
+    Headings inside fenced code blocks are ignored.
+
+    Returns:
+        List of (heading path, lines) tuples; lines keep their line endings
+    """
+    sections = []
+    headings = []
+    lines = []
+    in_fence = None
+
+    for line in content.splitlines(keepends=True):
+        fence = FENCE_RE.match(line)
+        if fence:
+            if in_fence is None:
+                in_fence = fence.group(1)
+            elif fence.group(1) == in_fence:
+                in_fence = None
+        elif in_fence is None:
+            heading = HEADING_RE.match(line.rstrip('\r\n'))
+            if heading:
+                if lines:
+                    sections.append((' > '.join(title for _, title in headings), lines))
+                level = len(heading.group(1))
+                headings = [(lvl, title) for lvl, title in headings if lvl < level]
+                headings.append((level, heading.group(2)))
+                lines = []
+
+        lines.append(line)
+
+    if lines:
+        sections.append((' > '.join(title for _, title in headings), lines))
+
+    return sections
+
+
+def _is_symbol(identifier: str) -> bool:
+    """Tell API symbols (dotted, snake_case or camelCase names) from plain words."""
+    return '.' in identifier or '_' in identifier or (
+        identifier[1:] != identifier[1:].lower() and not identifier.isupper()
+    )
+
+
+def code_symbols(text: str) -> str:
+    """
+    Collect the identifiers of a chunk's code, for the 'symbols' field.
+
+    Every identifier in an inline code span is kept. In fenced code blocks,
+    only identifiers that look like API symbols are kept: dotted, snake_case
+    or camelCase names, and names that are called, so keywords and local
+    prose-like names do not dilute the field.
+
+    Args:
+        text: Markdown text of a chunk
+
+    Returns:
+        The distinct identifiers, separated by spaces, in order of appearance
+    """
+    symbols = {}
+    in_fence = None
+
+    for line in text.splitlines():
+        fence = FENCE_RE.match(line)
+        if fence:
+            if in_fence is None:
+                in_fence = fence.group(1)
+            elif fence.group(1) == in_fence:
+                in_fence = None
+        elif in_fence is not None:
+            for match in IDENTIFIER_RE.finditer(line):
+                identifier = match.group().rstrip('(')
+                if match.group('call') or _is_symbol(identifier):
+                    symbols[identifier] = None
+        elif '`' in line:
+            for span in INLINE_CODE_RE.findall(line):
+                for match in IDENTIFIER_RE.finditer(span):
+                    symbols[match.group().rstrip('(')] = None
+
+    return ' '.join(symbols)
+
+
+def _split_long_line(line: str, max_chars: int) -> list[str]:
+    """Hard-split a single line that is longer than the chunk size cap."""
+    return [line[i:i + max_chars] for i in range(0, len(line), max_chars)]
+
+
+def chunk_document(doc: dict, max_chars: int = DEFAULT_CHUNK_SIZE,
+                   overlap: int = DEFAULT_CHUNK_OVERLAP) -> list[dict]:
+    """
+    Split a document into chunks by markdown heading and size cap.
+
+    Each heading starts a new chunk. Sections longer than max_chars are
+    split on line boundaries, and consecutive chunks of the same section
+    share up to overlap characters of trailing lines.
+
+    Args:
+        doc: Document with 'filename' and 'content' fields
+        max_chars: Maximum chunk size in characters
+        overlap: Number of characters repeated between consecutive chunks of a section
+
+    Returns:
+        List of chunks with 'section' (heading path), 'content', 'symbols'
+        (see code_symbols), and 'start'/'end' byte offsets into the UTF-8
+        encoded document, plus the other fields of the document (e.g.
+        'filename' and 'member')
+    """
+    chunks = []
+    offset = 0
+    metadata = {key: value for key, value in doc.items() if key != 'content'}
+
+    for section, section_lines in _split_sections(doc['content']):
+        # (text, start byte) for each piece of the section
+        pieces = []
+        for line in section_lines:
+            for piece in _split_long_line(line, max_chars):
+                pieces.append((piece, offset))
+                offset += len(piece.encode('utf-8'))
+        section_end = offset
+
+        start = 0
+        while start < len(pieces):
+            end = start
+            size = 0
+            while end < len(pieces) and (end == start or size + len(pieces[end][0]) <= max_chars):
+                size += len(pieces[end][0])
+                end += 1
+
+            text = ''.join(piece for piece, _ in pieces[start:end])
+            if text.strip():
+                chunks.append({
+                    **metadata,
+                    'section': section,
+                    'content': text,
+                    'symbols': code_symbols(text),
+                    'start': pieces[start][1],
+                    'end': pieces[end][1] if end < len(pieces) else section_end,
+                })
+
+            if end >= len(pieces):
+                break
+
+            # Step back over trailing pieces to create the overlap, but always move forward
+            next_start = end
+            carried = 0
+            while next_start - 1 > start and carried + len(pieces[next_start - 1][0]) <= overlap:
+                next_start -= 1
+                carried += len(pieces[next_start][0])
+            start = next_start
+
+    return chunks
+
+
+def iter_chunks(docs: Iterable[dict], max_chars: int = DEFAULT_CHUNK_SIZE,
+                overlap: int = DEFAULT_CHUNK_OVERLAP) -> Iterator[dict]:
+    """
+    Lazily split a stream of documents into section-aware chunks.
+
+    Args:
+        docs: Iterable of documents with 'filename' and 'content' fields
+        max_chars: Maximum chunk size in characters
+        overlap: Number of characters repeated between consecutive chunks of a section
+
+    Yields:
+        Chunks (see chunk_document)
+    """
+    for doc in docs:
+        yield from chunk_document(doc, max_chars=max_chars, overlap=overlap)
+
+
+def chunk_docs(docs: list[dict], max_chars: int = DEFAULT_CHUNK_SIZE,
+               overlap: int = DEFAULT_CHUNK_OVERLAP) -> list[dict]:
     """
-    Create a minsearch index from documents.
+    Split documents into section-aware chunks.
 
     Args:
         docs: List of documents with 'filename' and 'content' fields
+        max_chars: Maximum chunk size in characters
+        overlap: Number of characters repeated between consecutive chunks of a section
+
+    Returns:
+        List of chunks (see chunk_document)
+    """
+    return list(iter_chunks(docs, max_chars=max_chars, overlap=overlap))
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """Group an iterable into lists of at most batch_size items."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def read_chunk_contents(zip_path: str, chunks: list[dict]) -> list[str]:
+    """
+    Read the text of chunks back from their zip archive.
+
+    Used for indexes that do not keep chunk content in memory. Each member
+    is decompressed once and sliced by the chunks' byte offsets.
+
+    Args:
+        zip_path: Path to the zip file the chunks were loaded from
+        chunks: Chunks with 'member', 'start' and 'end' fields
+
+    Returns:
+        The content of each chunk, in the same order
+    """
+    contents = []
+    member_data = {}
+
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        for chunk in chunks:
+            member = chunk['member']
+            if member not in member_data:
+                member_data[member] = zf.read(member)
+            contents.append(member_data[member][chunk['start']:chunk['end']].decode('utf-8', errors='replace'))
+
+    return contents
+
+
+@lru_cache(maxsize=65536)
+def _subwords(word: str) -> tuple[str, ...]:
+    """Return the lowercased parts of a dotted, snake_case or camelCase identifier, other than the whole."""
+    parts = []
+    for part in word.split('.'):
+        parts.append(part)
+        pieces = part.split('_')
+        if len(pieces) > 1:
+            parts.extend(pieces)
+        for piece in pieces:
+            if piece.isascii() and piece[1:] != piece[1:].lower() and not piece.isupper():
+                parts.extend(CAMEL_RE.findall(piece))
+
+    whole = word.lower()
+    return tuple(dict.fromkeys(
+        lowered for lowered in (part.lower() for part in parts) if len(lowered) > 1 and lowered != whole
+    ))
+
+
+def _strip_tag(match: re.Match) -> str:
+    """Replace a tag with its quoted attribute values."""
+    values = ' '.join(double or single for double, single in ATTRIBUTE_VALUE_RE.findall(match.group()))
+    return f' {values} '
+
+
+def strip_mdx(text: str) -> str:
+    """Remove MDX/JSX noise (ESM lines, comments and tags) from markdown, keeping tag attribute values."""
+    if 'import' in text or 'export' in text:
+        text = ESM_RE.sub('', text)
+    if '<!--' in text or '{/*' in text:
+        text = MDX_COMMENT_RE.sub(' ', text)
+    if '<' in text:
+        text = TAG_RE.sub(_strip_tag, text)
+    return text
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split markdown into lowercased terms, for indexing and for queries.
+
+    MDX/JSX noise is stripped first. Then, in a single scan over the words,
+    each word is kept whole (including dotted paths such as
+    'fastmcp.add_tool'), and identifiers are also split into their dotted,
+    snake_case and camelCase parts, so 'FastMCP.add_tool' matches queries for
+    'add_tool', 'add tool' or 'FastMCP'. Single characters are dropped, as
+    with minsearch's default token pattern.
+
+    The per-word work is done in C where possible: whole words are
+    lowercased in one go, and only distinct words that are not plain
+    lowercase are split in Python, with their parts cached.
+
+    Args:
+        text: Markdown text or a query
 
     Returns:
-        Fitted minsearch Index
+        The whole words in order, followed by the parts of identifiers
+    """
+    words = WORD_RE.findall(strip_mdx(text))
+    tokens = ' '.join(words).lower().split()
+    for word, count in Counter(words).items():
+        if not word.islower() or '_' in word or '.' in word:
+            tokens.extend(_subwords(word) * count)
+    return tokens
+
+
+def iter_tokens(text: str) -> Iterator[tuple[str, int]]:
+    """
+    Yield the terms of a text with the offset of the word they come from.
+
+    Uses the same splitting as tokenize, without stripping MDX noise, so
+    offsets stay valid for the original text.
+    """
+    for match in WORD_RE.finditer(text):
+        word = match.group()
+        yield word.lower(), match.start()
+        if _is_symbol(word):
+            for subword in _subwords(word):
+                yield subword, match.start()
+
+
+def _sparse_nbytes(matrix: sp.spmatrix) -> int:
+    """Return the memory used by the arrays of a CSR or CSC matrix."""
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+
+def _vocabulary_nbytes(vocabulary: dict) -> int:
+    """Approximate the memory used by a term -> column dictionary."""
+    return sys.getsizeof(vocabulary) + sum(sys.getsizeof(term) + 28 for term in vocabulary)
+
+
+def _docs_nbytes(docs: list[dict]) -> int:
+    """
+    Approximate the memory used by a list of flat document dicts.
+
+    Strings shared between chunks of the same file (filename, member) are
+    counted once per chunk, so this slightly overestimates.
     """
-    index = Index(
-        text_fields=['content'],
-        keyword_fields=['filename']
+    return sys.getsizeof(docs) + sum(
+        sys.getsizeof(doc) + sum(sys.getsizeof(value) for value in doc.values())
+        for doc in docs
     )
+
+
+class SearchBackend(Protocol):
+    """
+    Interface of the search engines behind create_index.
+
+    Attributes:
+        docs (list): Documents indexed, in index order.
+        vocabulary (Collection): Terms the index can match.
+    """
+
+    docs: list[dict]
+    vocabulary: Collection[str]
+
+    def fit(self, docs: list[dict]) -> "SearchBackend":
+        """Fit the index from scratch with the provided documents."""
+
+    def add(self, docs: list[dict]) -> "SearchBackend":
+        """Add documents to a fitted index without refitting it."""
+
+    def remove(self, members: set[str]) -> int:
+        """Remove all documents loaded from the given zip members and return how many were removed."""
+
+    def search(self, query: str, num_results: int = 10, boost_dict: dict | None = None,
+               output_ids: bool = False, output_scores: bool = False) -> list[dict]:
+        """Return the documents that best match a query, best first, optionally with a '_score' field."""
+
+    def memory_usage(self) -> int:
+        """Return the approximate resident size of the index, including its documents, in bytes."""
+
+
+class MinsearchBackend:
+    """
+    Search backend wrapping a minsearch Index.
+
+    The Index's vectorizers use tokenize instead of minsearch's default
+    token pattern, so both backends index the same terms.
+
+    Documents added after the last fit are transformed with the already fitted
+    vectorizers, so the vocabulary and IDF weights stay as they were at the
+    last full fit: terms that only occur in added documents are not
+    searchable until the index is rebuilt.
+
+    Attributes:
+        index (Index): The wrapped minsearch Index.
+        store_content (bool): If False, 'content' is dropped from stored documents
+                              once vectorized and must be read back by the caller.
+    """
+
+    def __init__(self, text_fields: list[str], keyword_fields: list[str] | None = None, store_content: bool = True):
+        self.index = Index(
+            text_fields=text_fields,
+            keyword_fields=keyword_fields,
+            vectorizer_params={'tokenizer': tokenize, 'lowercase': False, 'token_pattern': None}
+        )
+        self.store_content = store_content
+
+    @property
+    def docs(self) -> list[dict]:
+        """Documents indexed, in index order."""
+        return self.index.docs
+
+    @property
+    def vocabulary(self) -> frozenset[str]:
+        """Terms of all fitted text fields; added documents do not extend it."""
+        if getattr(self, '_vocabulary', None) is None:
+            self._vocabulary = frozenset(
+                term
+                for vectorizer in self.index.vectorizers.values() if hasattr(vectorizer, 'vocabulary_')
+                for term in vectorizer.vocabulary_
+            )
+        return self._vocabulary
+
+    def _stored(self, docs: list[dict]) -> list[dict]:
+        """Return the documents as kept in the index: without index-only fields, and with content only if stored."""
+        dropped = INDEX_ONLY_FIELDS if self.store_content else INDEX_ONLY_FIELDS | {'content'}
+        return [{key: value for key, value in doc.items() if key not in dropped} for doc in docs]
+
+    def fit(self, docs: list[dict]) -> "MinsearchBackend":
+        self._vocabulary = None
+        self.index.fit(list(docs))
+        self.index.docs = self._stored(self.index.docs)
+        return self
+
+    def _row_aligned_fields(self) -> list[str]:
+        """
+        Return the text fields whose matrix has one row per document.
+
+        minsearch fits a single-row dummy matrix for fields without any terms;
+        those are left alone by incremental updates.
+        """
+        index = self.index
+        return [
+            field for field in index.text_fields
+            if field in index.text_matrices and index.text_matrices[field].shape[0] == len(index.docs)
+        ]
+
+    def add(self, docs: list[dict]) -> "MinsearchBackend":
+        if not docs:
+            return self
+
+        index = self.index
+        if not index.docs:
+            return self.fit(docs)
+
+        for field in self._row_aligned_fields():
+            texts = [doc.get(field, '') or '' for doc in docs]
+            new_rows = index.vectorizers[field].transform(texts)
+            index.text_matrices[field] = sp.vstack([index.text_matrices[field], new_rows], format='csr')
+
+        index.docs = index.docs + self._stored(list(docs))
+        new_keywords = pd.DataFrame({field: [doc.get(field) for doc in docs] for field in index.keyword_fields})
+        index.keyword_df = pd.concat([index.keyword_df, new_keywords], ignore_index=True)
+
+        return self
+
+    def remove(self, members: set[str]) -> int:
+        index = self.index
+        keep = np.array([doc.get('member') not in members for doc in index.docs], dtype=bool)
+        removed = int(len(keep) - keep.sum())
+        if removed == 0:
+            return 0
+
+        for field in self._row_aligned_fields():
+            index.text_matrices[field] = index.text_matrices[field][keep]
+
+        index.docs = [doc for doc, kept in zip(index.docs, keep) if kept]
+        index.keyword_df = index.keyword_df[keep].reset_index(drop=True)
+
+        return removed
+
+    def search(self, query: str, num_results: int = 10, boost_dict: dict | None = None,
+               output_ids: bool = False, output_scores: bool = False) -> list[dict]:
+        results = self.index.search(query, boost_dict=boost_dict, num_results=num_results,
+                                    output_ids=output_ids or output_scores)
+        if not output_scores or not results:
+            return results
+
+        # With output_ids, minsearch returns fresh copies that can be annotated in place
+        scores = self._scores(query, [result['_id'] for result in results], boost_dict or {})
+        for result, score in zip(results, scores):
+            result['_score'] = float(score)
+            if not output_ids:
+                del result['_id']
+        return results
+
+    def _scores(self, query: str, doc_ids: list[int], boost_dict: dict) -> np.ndarray:
+        """
+        Recompute the scores minsearch ranked the given documents by.
+
+        minsearch does not return scores, but its TF-IDF rows and query
+        vectors are L2-normalized, so the cosine similarity of each field is
+        a dot product over the matched rows only.
+        """
+        index = self.index
+        scores = np.zeros(len(doc_ids), dtype=np.float32)
+        for field in self._row_aligned_fields():
+            query_vector = index.vectorizers[field].transform([query])
+            field_scores = (index.text_matrices[field][doc_ids] @ query_vector.T).toarray().ravel()
+            scores += field_scores * boost_dict.get(field, 1)
+        return scores
+
+    def memory_usage(self) -> int:
+        index = self.index
+        total = _docs_nbytes(index.docs)
+        total += sum(_sparse_nbytes(matrix) for matrix in index.text_matrices.values())
+        for vectorizer in index.vectorizers.values():
+            if hasattr(vectorizer, 'vocabulary_'):
+                total += _vocabulary_nbytes(vectorizer.vocabulary_) + vectorizer.idf_.nbytes
+        if index.keyword_df is not None:
+            total += int(index.keyword_df.memory_usage(deep=True).sum())
+        return total
+
+
+class SparseIndex:
+    """
+    Vectorized TF-IDF or BM25 index over sparse term-count matrices.
+
+    Raw term counts of every field are kept as CSR blocks over a shared,
+    growing vocabulary, so the index can be fitted in batches. Term weights
+    are recomputed lazily the next time the index is searched, and the
+    fields are stacked side by side into a single CSC matrix. A query is then
+    scored with one sparse matrix-vector product over the columns of its
+    terms, and the top k documents are selected with argpartition.
+
+    With 'tfidf' weighting, scores are cosine similarities using the same
+    tokenization (see tokenize) and smoothed IDF as MinsearchBackend. With 'bm25' weighting,
+    scores are Okapi BM25 with parameters k1 and b.
+
+    Attributes:
+        text_fields (list): List of text field names to index.
+        keyword_fields (list): List of keyword field names to filter on.
+        weighting (str): 'tfidf' or 'bm25'.
+        store_content (bool): If False, 'content' is dropped from stored documents
+                              and must be read back by the caller (see read_chunk_contents).
+                              Index-only fields are always dropped.
+        vocabulary (dict): Mapping of term to column index.
+        docs (list): List of documents indexed.
+    """
+
+    def __init__(self, text_fields: list[str], keyword_fields: list[str] | None = None,
+                 weighting: str = 'tfidf', k1: float = 1.2, b: float = 0.75, store_content: bool = True):
+        if weighting not in ('tfidf', 'bm25'):
+            raise ValueError(f"Unknown weighting: {weighting!r} (expected 'tfidf' or 'bm25')")
+
+        self.text_fields = text_fields
+        self.keyword_fields = keyword_fields if keyword_fields is not None else []
+        self.weighting = weighting
+        self.k1 = k1
+        self.b = b
+        self.store_content = store_content
+        self.vocabulary = {}
+        self.docs = []
+        self._blocks = {field: [] for field in text_fields}
+        self._weighted = None
+
+    def _count_terms(self, texts: list[str]) -> sp.csr_matrix:
+        """Build a CSR matrix of raw term counts, adding new terms to the vocabulary."""
+        vocabulary = self.vocabulary
+        indptr = [0]
+        indices = []
+        data = []
+
+        for text in texts:
+            counts = Counter(tokenize(text))
+            for term, count in counts.items():
+                column = vocabulary.get(term)
+                if column is None:
+                    column = vocabulary[term] = len(vocabulary)
+                indices.append(column)
+                data.append(count)
+            indptr.append(len(indices))
+
+        return sp.csr_matrix(
+            (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=(len(texts), len(vocabulary))
+        )
+
+    def partial_fit(self, docs: list[dict]) -> "SparseIndex":
+        """
+        Add a batch of documents to the index.
+
+        Args:
+            docs (list of dict): Documents to index.
+        """
+        if not docs:
+            return self
+
+        for field in self.text_fields:
+            self._blocks[field].append(self._count_terms([doc.get(field, '') or '' for doc in docs]))
+
+        dropped = INDEX_ONLY_FIELDS if self.store_content else INDEX_ONLY_FIELDS | {'content'}
+        self.docs.extend({key: value for key, value in doc.items() if key not in dropped} for doc in docs)
+
+        self._weighted = None
+        return self
+
+    add = partial_fit
+
+    def fit(self, docs: list[dict]) -> "SparseIndex":
+        """
+        Fit the index from scratch with the provided documents.
+
+        Args:
+            docs (list of dict): Documents to index.
+        """
+        self.vocabulary = {}
+        self.docs = []
+        self._blocks = {field: [] for field in self.text_fields}
+        self._weighted = None
+        return self.partial_fit(docs)
+
+    def _counts(self, field: str) -> sp.csr_matrix:
+        """Merge the count blocks of a field into one matrix over the current vocabulary."""
+        blocks = self._blocks[field]
+        for block in blocks:
+            block.resize((block.shape[0], len(self.vocabulary)))
+
+        if len(blocks) > 1:
+            blocks[:] = [sp.vstack(blocks, format='csr')]
+
+        if not blocks:
+            return sp.csr_matrix((0, len(self.vocabulary)), dtype=np.float32)
+        return blocks[0]
+
+    def _weigh(self, counts: sp.csr_matrix) -> tuple[sp.csc_matrix, np.ndarray]:
+        """Turn raw counts into a weighted CSC matrix and the per-term query weights."""
+        num_docs = counts.shape[0]
+        doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+
+        if self.weighting == 'bm25':
+            idf = np.log(1 + (num_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+            doc_len = np.asarray(counts.sum(axis=1)).ravel()
+            avg_len = doc_len.mean() if num_docs else 0
+            norm = self.k1 * (1 - self.b + self.b * doc_len / (avg_len or 1))
+            # Saturate every stored count with its row's length normalization
+            tf = counts.data
+            row_norm = np.repeat(norm, np.diff(counts.indptr)).astype(np.float32)
+            matrix = sp.csr_matrix(
+                (tf * (self.k1 + 1) / (tf + row_norm) * idf[counts.indices], counts.indices, counts.indptr),
+                shape=counts.shape
+            )
+        else:
+            idf = (np.log((1 + num_docs) / (1 + doc_freq)) + 1).astype(np.float32)
+            matrix = counts @ sp.diags(idf, format='csr')
+            norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()).astype(np.float32)
+            norms[norms == 0] = 1
+            matrix = sp.diags(1 / norms, format='csr') @ matrix
+
+        # CSC gives direct access to the postings of each query term
+        return matrix.tocsc(), idf
+
+    def _prepare(self) -> dict:
+        """
+        Compute the weighted matrix, IDF weights and keyword arrays used by search.
+
+        Field i occupies columns [i * V, (i + 1) * V) of the stacked matrix,
+        where V is the vocabulary size.
+        """
+        if self._weighted is not None:
+            return self._weighted
+
+        matrices, idfs = zip(*(self._weigh(self._counts(field)) for field in self.text_fields))
+        self._weighted = {
+            'matrix': sp.hstack(matrices, format='csc'),
+            'idf': idfs,
+            'keywords': {
+                field: np.array([doc.get(field) for doc in self.docs], dtype=object)
+                for field in self.keyword_fields
+            },
+        }
+        return self._weighted
+
+    def search(self, query: str, filter_dict: dict | None = None, boost_dict: dict | None = None,
+               num_results: int = 10, output_ids: bool = False, output_scores: bool = False) -> list[dict]:
+        """
+        Search the index with the given query, keyword filters and field boosts.
+
+        Args:
+            query (str): The search query string.
+            filter_dict (dict): Keyword field values that results must match.
+            boost_dict (dict): Boost scores for text fields.
+            num_results (int): The number of top results to return.
+            output_ids (bool): If True, adds an '_id' field to each document.
+            output_scores (bool): If True, adds a '_score' field to each document.
+
+        Returns:
+            list of dict: Matching documents ranked by relevance.
+        """
+        filter_dict = filter_dict or {}
+        boost_dict = boost_dict or {}
+
+        if not self.docs:
+            return []
+
+        query_counts = Counter(
+            self.vocabulary[term] for term in tokenize(query) if term in self.vocabulary
+        )
+        if not query_counts:
+            return []
+
+        weighted = self._prepare()
+        columns = np.fromiter(query_counts.keys(), dtype=np.int64)
+        query_tf = np.fromiter(query_counts.values(), dtype=np.float32)
+        vocabulary_size = len(self.vocabulary)
+
+        field_columns = []
+        field_weights = []
+        for i, field in enumerate(self.text_fields):
+            if self.weighting == 'bm25':
+                weights = query_tf
+            else:
+                weights = query_tf * weighted['idf'][i][columns]
+                weights = weights / np.linalg.norm(weights)
+            field_columns.append(columns + i * vocabulary_size)
+            field_weights.append(weights * boost_dict.get(field, 1))
+
+        query_columns = np.concatenate(field_columns)
+        scores = weighted['matrix'][:, query_columns] @ np.concatenate(field_weights)
+
+        for field, value in filter_dict.items():
+            if field in self.keyword_fields:
+                scores *= weighted['keywords'][field] == value
+
+        return self._top_documents(scores, num_results, output_ids, output_scores)
+
+    def _top_documents(self, scores: np.ndarray, num_results: int, output_ids: bool,
+                       output_scores: bool = False) -> list[dict]:
+        """Select the num_results best scoring documents with argpartition."""
+        if num_results < len(scores):
+            candidates = np.argpartition(scores, -num_results)[-num_results:]
+        else:
+            candidates = np.arange(len(scores))
+
+        candidates = candidates[scores[candidates] > 0]
+        top_indices = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        if not output_ids and not output_scores:
+            return [self.docs[i] for i in top_indices]
+
+        results = []
+        for i in top_indices:
+            result = dict(self.docs[i])
+            if output_ids:
+                result['_id'] = int(i)
+            if output_scores:
+                result['_score'] = float(scores[i])
+            results.append(result)
+        return results
+
+    def remove(self, members: set[str]) -> int:
+        """
+        Remove all documents loaded from the given zip members.
+
+        Args:
+            members: Zip member names whose documents should be removed
+
+        Returns:
+            Number of documents removed
+        """
+        keep = np.array([doc.get('member') not in members for doc in self.docs], dtype=bool)
+        removed = int(len(keep) - keep.sum())
+        if removed == 0:
+            return 0
+
+        for field in self.text_fields:
+            self._blocks[field] = [self._counts(field)[keep]]
+
+        self.docs = [doc for doc, kept in zip(self.docs, keep) if kept]
+        self._weighted = None
+        return removed
+
+    def memory_usage(self) -> int:
+        """Return the approximate resident size of the index, including its documents, in bytes."""
+        total = _docs_nbytes(self.docs) + _vocabulary_nbytes(self.vocabulary)
+        total += sum(_sparse_nbytes(block) for blocks in self._blocks.values() for block in blocks)
+        if self._weighted is not None:
+            total += _sparse_nbytes(self._weighted['matrix'])
+            total += sum(idf.nbytes for idf in self._weighted['idf'])
+            total += sum(values.nbytes for values in self._weighted['keywords'].values())
+        return total
+
+
+# Search backends available to create_index
+BACKENDS = {
+    'minsearch': MinsearchBackend,
+    'tfidf': partial(SparseIndex, weighting='tfidf'),
+    'bm25': partial(SparseIndex, weighting='bm25'),
+}
+
+
+def create_index(docs: list[dict], backend: str = 'minsearch', store_content: bool = True) -> SearchBackend:
+    """
+    Create a search index from documents.
+
+    Args:
+        docs: List of documents or chunks with 'filename' and 'content'
+              fields, and optionally 'section' and 'symbols' fields
+        backend: Name of the search backend (see BACKENDS)
+        store_content: Keep document content in the index; if False, content
+                       must be read back by the caller (e.g. from a DocumentStore)
+
+    Returns:
+        Fitted search backend
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown search backend: {backend!r} (expected one of {', '.join(BACKENDS)})")
+
+    index = BACKENDS[backend](text_fields=list(FIELD_BOOSTS), keyword_fields=['filename'],
+                              store_content=store_content)
     index.fit(docs)
     return index
 
 
-def search(index: Index, query: str, num_results: int = 5) -> list[dict]:
+def create_index_streaming(docs: Iterable[dict], batch_size: int = DEFAULT_BATCH_SIZE,
+                           weighting: str = 'tfidf', store_content: bool = False,
+                           store_writer: DocumentStoreWriter | None = None) -> SparseIndex:
+    """
+    Build a SparseIndex from a stream of documents in bounded batches.
+
+    Documents are chunked lazily and fitted batch by batch, so only one batch
+    of decoded text is alive at a time. With store_content=False the index
+    keeps chunk metadata and byte offsets only, and result text is read back
+    with read_chunk_contents, or from the document store if a store_writer
+    was given.
+
+    Args:
+        docs: Iterable of documents, e.g. iter_docs_from_zip(zip_path)
+        batch_size: Number of chunks fitted per batch
+        weighting: 'tfidf' or 'bm25'
+        store_content: Keep chunk content in the index
+        store_writer: Document store to append every chunk's content to,
+                      recording its id as the chunk's 'doc_id'
+
+    Returns:
+        Fitted SparseIndex
+    """
+    index = SparseIndex(
+        text_fields=list(FIELD_BOOSTS),
+        keyword_fields=['filename'],
+        weighting=weighting,
+        store_content=store_content
+    )
+    for batch in iter_batches(iter_chunks(docs), batch_size):
+        if store_writer is not None:
+            store_writer.add(batch)
+        index.partial_fit(batch)
+
+    # Compute the weights now rather than on the first query
+    index._prepare()
+    return index
+
+
+def search(index: SearchBackend, query: str, num_results: int = 5, output_scores: bool = False) -> list[dict]:
     """
     Search the index for relevant documents.
 
+    Text fields are weighted by FIELD_BOOSTS, so matches in headings and
+    code symbols count more than matches in body text.
+
     Args:
-        index: The minsearch Index
+        index: The fitted search backend
         query: Search query string
         num_results: Number of results to return (default: 5)
+        output_scores: Add the relevance score of each result as a '_score' field
 
     Returns:
         List of matching documents
     """
-    return index.search(query, num_results=num_results)
+    return index.search(query, num_results=num_results, boost_dict=FIELD_BOOSTS, output_scores=output_scores)
 
 
 if __name__ == "__main__":
@@ -86,9 +1131,13 @@ if __name__ == "__main__":
     for doc in docs[:5]:
         print(f"  - {doc['filename']}")
 
+    # Split into chunks
+    chunks = chunk_docs(docs)
+    print(f"Split into {len(chunks)} chunks")
+
     # Create the index
     print("\nCreating search index...")
-    index = create_index(docs)
+    index = create_index(chunks)
 
     # Test search with "demo"
     print("\nSearching for 'demo'...")
@@ -96,7 +1145,7 @@ if __name__ == "__main__":
 
     print(f"\nTop {len(results)} results:")
     for i, result in enumerate(results, 1):
-        print(f"{i}. {result['filename']}")
+        print(f"{i}. {result['filename']} ({result['section']})")
         # Show first 200 chars of content
         preview = result['content'][:200].replace('\n', ' ')
         print(f"   Preview: {preview}...")
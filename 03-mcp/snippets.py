@@ -0,0 +1,110 @@
+"""Query-aware snippet extraction from search results."""
+
+from collections import Counter
+from functools import lru_cache
+
+from search import iter_tokens, tokenize
+
+ELLIPSIS = "..."
+
+
+@lru_cache(maxsize=4096)
+def term_positions(text: str) -> dict[str, tuple[int, ...]]:
+    """
+    Index the start offset of every term occurrence in a text.
+
+    Terms are those of the search tokenizer, so parts of identifiers point
+    at the identifier they come from. Results are memoized, so chunks that
+    keep coming back in the top hits are only tokenized once.
+
+    Args:
+        text: Text to index
+
+    Returns:
+        Mapping of lowercased term to the sorted character offsets where it occurs
+    """
+    positions = {}
+    for term, offset in iter_tokens(text):
+        positions.setdefault(term, []).append(offset)
+    return {term: tuple(offsets) for term, offsets in positions.items()}
+
+
+def _best_window(hits: list[tuple[int, str]], width: int) -> tuple[int, int]:
+    """
+    Return the start and end offset of the densest run of hits spanning at most width characters.
+
+    Runs are ranked by the number of distinct query terms they contain, then
+    by the number of hits, and found in one pass with a sliding window.
+    """
+    best = (0, 0, 0, 0)
+    counts = Counter()
+    end = 0
+
+    for start, term in hits:
+        while end < len(hits) and hits[end][0] <= start + width:
+            counts[hits[end][1]] += 1
+            end += 1
+
+        score = (len(counts), sum(counts.values()))
+        if score > best[:2]:
+            last_offset, last_term = hits[end - 1]
+            best = (*score, start, last_offset + len(last_term))
+
+        counts[term] -= 1
+        if not counts[term]:
+            del counts[term]
+
+    return best[2], best[3]
+
+
+def _snap(text: str, start: int, end: int) -> tuple[int, int]:
+    """Pull the edges of a window in to the nearest space, so words are not cut in half."""
+    if start > 0:
+        space = text.find(" ", start, min(len(text), start + 40))
+        if space != -1 and text[start - 1] not in " \n":
+            start = space + 1
+    if end < len(text):
+        space = text.rfind(" ", max(start, end - 40), end)
+        if space != -1 and text[end] not in " \n":
+            end = space
+    return start, end
+
+
+def extract_snippet(text: str, query: str, max_chars: int) -> str:
+    """
+    Cut the passage of a text that best matches a query down to max_chars characters.
+
+    The window is placed over the densest cluster of query term occurrences,
+    found through the text's term positions, then widened to use the full
+    budget and trimmed to word boundaries. Text without any query term is
+    cut from the start.
+
+    Args:
+        text: Full text of a search result
+        query: The search query
+        max_chars: Maximum snippet length, not counting ellipses (0 for the whole text)
+
+    Returns:
+        The snippet, with ellipses where text was cut
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+
+    positions = term_positions(text)
+    hits = sorted(
+        (offset, term)
+        for term in set(tokenize(query))
+        for offset in positions.get(term, ())
+    )
+
+    if hits:
+        first, last = _best_window(hits, max_chars)
+        # Center the matched span in the budget, shifting it back inside the text
+        start = max(0, min(first - (max_chars - (last - first)) // 2, len(text) - max_chars))
+    else:
+        start = 0
+    end = start + max_chars
+
+    start, end = _snap(text, start, end)
+    snippet = text[start:end].strip()
+    return f"{ELLIPSIS if start > 0 else ''}{snippet}{ELLIPSIS if end < len(text) else ''}"
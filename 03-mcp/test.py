@@ -1,6 +1,13 @@
 """Test script for the fetch_page function."""
 
+import asyncio
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 from main import fetch_page_content
+from page_fetcher import PageCache, PageFetcher
 
 
 def test_fetch_page():
@@ -9,7 +16,7 @@ def test_fetch_page():
     print(f"Fetching content from: {url}")
     print("-" * 50)
 
-    content = fetch_page_content(url)
+    content = asyncio.run(fetch_page_content(url))
 
     # Print first 2000 characters to verify it works
     print(content[:2000])
@@ -17,5 +24,90 @@ def test_fetch_page():
     print(f"Total content length: {len(content)} characters")
 
 
+class StubReaderHandler(BaseHTTPRequestHandler):
+    """Stand-in for Jina Reader that serves every page with an ETag and counts requests."""
+
+    requests_seen = 0
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests_seen += 1
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+
+        try:
+            time.sleep(0.05)
+            url = self.path.lstrip("/")
+            if url.endswith("/missing"):
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            etag = f'"{hash(url)}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+
+            body = f"# Stub page\n\nContent of {url}\n".encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/markdown; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_fetch_pages_stub():
+    """Test caching, revalidation and concurrent fetching against a local stub reader."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubReaderHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    reader_url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    async def run(cache_dir):
+        cache = PageCache(cache_dir, ttl=3600)
+        fetcher = PageFetcher(reader_url=reader_url, timeout=5, cache=cache)
+
+        # First fetch downloads, second one is served from the cache
+        content = await fetcher.fetch("https://example.com/a")
+        assert "Content of https://example.com/a" in content
+        await fetcher.fetch("https://example.com/a")
+        assert (fetcher.downloads, fetcher.hits) == (1, 1)
+        assert StubReaderHandler.requests_seen == 1
+
+        # Once the entry is stale, it is revalidated with its ETag
+        cache.ttl = 0
+        assert await fetcher.fetch("https://example.com/a") == content
+        assert fetcher.revalidations == 1
+        cache.ttl = 3600
+
+        # Batch fetch respects the concurrency limit and reports failures per URL
+        urls = [f"https://example.com/page{i}" for i in range(12)] + ["https://example.com/missing"]
+        results = await fetcher.fetch_many(urls, max_concurrency=3)
+        assert StubReaderHandler.max_in_flight <= 3
+        assert isinstance(results["https://example.com/missing"], Exception)
+        assert all(isinstance(results[url], str) for url in urls[:-1])
+
+        await fetcher.aclose()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        asyncio.run(run(cache_dir))
+
+    server.shutdown()
+    print(f"Stub reader test passed ({StubReaderHandler.requests_seen} requests, "
+          f"at most {StubReaderHandler.max_in_flight} concurrent)")
+
+
 if __name__ == "__main__":
+    test_fetch_pages_stub()
     test_fetch_page()